@@ -28,19 +28,29 @@ from PySide6.QtWidgets import (
 
 # === Import du moteur tel quel ===
 from study_planner import (
-    ContentBlock, ExamProfile, UserProfile, Constraints,
-    build_study_plan
+    ContentBlock, ExamProfile, UserProfile, Constraints, StudyCalendar,
+    PlanGraph, load_coefficients, parse_calendar_dates, parse_time_windows, format_clock,
+    UNIT_TYPE_REGISTRY, KIND_LABELS
 )
 
+from ics_export import write_ics
+from content_scan import scan_content_blocks
+from sensitivity import sensitivity_report
+from plan_cache import PlanCache, plan_key
+
 # ---------- Helpers UI ----------
 APP_NAME = "Planificateur d'étude"
 ASSETS_DIR = Path("assets")
 ICON_PATH = ASSETS_DIR / "icon.png"
+COEFFS_PATH = Path("coefficients.json")  # produit par calibration.py (optionnel)
 
 DENSITY_HINT = "0.8=aéré • 1.0=normal • 1.2=dense"
 LEVEL_HINT = "0.7=facile • 1.0=moyen • 1.3=difficile/nouveau"
 
-UNIT_TYPES = ["page", "slide", "video_min", "exo"]
+UNIT_TYPES = list(UNIT_TYPE_REGISTRY)
+WEEKDAY_LABELS = ["L", "M", "M", "J", "V", "S", "D"]
+SENSITIVITY_TOP = 10
+CALENDAR_HINT = "Dates AAAA-MM-JJ ou intervalles AAAA-MM-JJ..AAAA-MM-JJ, séparés par des virgules"
 
 QSS = """
 * { font-family: Inter, Segoe UI, Helvetica, Arial; }
@@ -128,8 +138,11 @@ class MainWindow(QMainWindow):
         export_csv_act.triggered.connect(self.export_csv)
         export_pdf_act = QAction("Exporter en PDF", self)
         export_pdf_act.triggered.connect(self.export_pdf)
+        export_ics_act = QAction("Exporter en ICS", self)
+        export_ics_act.triggered.connect(self.export_ics)
         self.menuBar().addAction(export_csv_act)
         self.menuBar().addAction(export_pdf_act)
+        self.menuBar().addAction(export_ics_act)
 
         # --- Widgets
         root = QWidget(); self.setCentralWidget(root)
@@ -143,9 +156,11 @@ class MainWindow(QMainWindow):
         btns = QHBoxLayout()
         add_btn = QPushButton("+ Ajouter un bloc")
         rm_btn = QPushButton("– Supprimer la sélection")
+        import_btn = QPushButton("Importer un dossier…")
         add_btn.clicked.connect(lambda: self.tbl.add_row())
         rm_btn.clicked.connect(self.tbl.remove_selected)
-        btns.addWidget(add_btn); btns.addWidget(rm_btn); btns.addStretch()
+        import_btn.clicked.connect(self.import_folder)
+        btns.addWidget(add_btn); btns.addWidget(rm_btn); btns.addWidget(import_btn); btns.addStretch()
         content_layout.addLayout(btns)
         content_layout.addWidget(self.tbl)
         self.tbl.add_row()  # ligne par défaut
@@ -165,6 +180,9 @@ class MainWindow(QMainWindow):
         g1.addWidget(QLabel("Mix QCM"), 1,0); g1.addWidget(self.mix_qcm, 1,1)
         g1.addWidget(QLabel("Mix problèmes"), 1,2); g1.addWidget(self.mix_prob, 1,3)
         g1.addWidget(QLabel("Mix rédaction"), 1,4); g1.addWidget(self.mix_red, 1,5)
+        self.course = QLineEdit(); self.course.setPlaceholderText("ex. MATH101")
+        self.course.setToolTip("Identifiant stable du cours : réexporter le calendrier met à jour les mêmes événements")
+        g1.addWidget(QLabel("Cours"), 2,0); g1.addWidget(self.course, 2,1)
 
         # Section Utilisateur
         gb_user = QGroupBox("Profil utilisateur")
@@ -179,11 +197,18 @@ class MainWindow(QMainWindow):
         self.retention = QDoubleSpinBox(); self.retention.setRange(0.3, 1.0); self.retention.setSingleStep(0.05); self.retention.setValue(0.6)
         self.target = QDoubleSpinBox(); self.target.setRange(0.5, 1.0); self.target.setSingleStep(0.05); self.target.setValue(0.8)
         self.mastery = QDoubleSpinBox(); self.mastery.setRange(0.0, 1.0); self.mastery.setSingleStep(0.05); self.mastery.setValue(0.5)
+        self.fatigue_threshold = QSpinBox(); self.fatigue_threshold.setRange(30, 720); self.fatigue_threshold.setValue(150)
+        self.fatigue_penalty = QDoubleSpinBox(); self.fatigue_penalty.setRange(1.0, 2.0); self.fatigue_penalty.setSingleStep(0.05); self.fatigue_penalty.setValue(1.2)
+        self.windows = QLineEdit("09:00-12:00, 14:00-18:00, 19:00-21:00"); self.windows.setToolTip("Plages HH:MM-HH:MM séparées par des virgules")
+        self.session_len = QSpinBox(); self.session_len.setRange(15, 240); self.session_len.setValue(50)
+        self.break_len = QSpinBox(); self.break_len.setRange(0, 60); self.break_len.setValue(10)
         g2_items = [
             ("Lecture (min/page)", self.v_page), ("Lecture (min/slide)", self.v_slide), ("Mult. vidéo", self.v_video),
             ("Prise de notes (×)", self.notes_factor), ("Pénalité langue (×)", self.lang_penalty),
             ("Min/exercice", self.exo_min_each), ("Taille set exos", self.set_size),
-            ("Sensibilité à l'oubli", self.retention), ("Objectif (0-1)", self.target), ("Maîtrise actuelle (0-1)", self.mastery)
+            ("Sensibilité à l'oubli", self.retention), ("Objectif (0-1)", self.target), ("Maîtrise actuelle (0-1)", self.mastery),
+            ("Seuil fatigue (min)", self.fatigue_threshold), ("Pénalité fatigue (×)", self.fatigue_penalty),
+            ("Plages dispo", self.windows), ("Séance (min)", self.session_len), ("Pause (min)", self.break_len)
         ]
         for i, (lbl, w) in enumerate(g2_items):
             r, c = divmod(i, 3)
@@ -201,10 +226,18 @@ class MainWindow(QMainWindow):
         self.want_mocks.setChecked(True)
         self.mock_dur = QSpinBox(); self.mock_dur.setRange(30, 300); self.mock_dur.setValue(90)
         self.mock_ratio = QDoubleSpinBox(); self.mock_ratio.setRange(0.0, 1.0); self.mock_ratio.setSingleStep(0.05); self.mock_ratio.setValue(0.5)
+        self.want_sessions = QCheckBox("Découper en séances horaires")
+        weekdays = QWidget(); wd_layout = QHBoxLayout(weekdays); wd_layout.setContentsMargins(0, 0, 0, 0)
+        self.blocked_weekdays: List[QCheckBox] = []
+        for lbl in WEEKDAY_LABELS:
+            cb = QCheckBox(lbl); wd_layout.addWidget(cb); self.blocked_weekdays.append(cb)
+        self.holidays = QLineEdit(); self.holidays.setPlaceholderText("2025-11-11, 2025-12-22..2026-01-02")
+        self.holidays.setToolTip(CALENDAR_HINT)
         g3_items = [
             ("Jours dispo", self.days), ("Max min/jour", self.max_day), ("Min min/jour", self.min_day),
-            ("Date de début", self.start_date), ("", QLabel("")), ("", QLabel("")),
-            ("Examens blancs", self.want_mocks), ("Durée mock (min)", self.mock_dur), ("Part correction (0-1)", self.mock_ratio)
+            ("Date de début", self.start_date), ("Jours bloqués", weekdays), ("Congés / fériés", self.holidays),
+            ("Examens blancs", self.want_mocks), ("Durée mock (min)", self.mock_dur), ("Part correction (0-1)", self.mock_ratio),
+            ("Séances", self.want_sessions)
         ]
         for i, (lbl, w) in enumerate(g3_items):
             r, c = divmod(i, 3)
@@ -216,7 +249,9 @@ class MainWindow(QMainWindow):
         actions = QHBoxLayout()
         self.btn_generate = QPushButton("Générer le plan")
         self.btn_generate.clicked.connect(self.generate_plan)
-        actions.addStretch(); actions.addWidget(self.btn_generate)
+        self.btn_sensitivity = QPushButton("Sensibilité")
+        self.btn_sensitivity.clicked.connect(self.show_sensitivity)
+        actions.addStretch(); actions.addWidget(self.btn_sensitivity); actions.addWidget(self.btn_generate)
 
         # Sortie (Résumé + Tableau)
         gb_out = QGroupBox("Résultats")
@@ -241,51 +276,98 @@ class MainWindow(QMainWindow):
         self.statusBar().showMessage("Prêt")
 
         self.plan_cache = None  # stocker le dernier résultat pour export
+        self.graph = PlanGraph()
+        self.disk_cache = PlanCache()  # plans déjà calculés (partagé avec la CLI et les lots)
+        self.coeffs = load_coefficients(str(COEFFS_PATH)) if COEFFS_PATH.exists() else None
+        if self.coeffs:
+            self.statusBar().showMessage("Prêt (coefficients calibrés)")
+
+    # ---------- Import d'un dossier de cours ----------
+    def import_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, "Importer un dossier de cours")
+        if not folder: return
+        try:
+            blocks = scan_content_blocks(folder)
+        except Exception as e:
+            QMessageBox.critical(self, APP_NAME, f"Erreur: {e}")
+            return
+        if not blocks:
+            QMessageBox.information(self, APP_NAME, "Aucun PDF, PPTX ou vidéo MP4/MOV reconnu dans ce dossier.")
+            return
+        for b in blocks:
+            self.tbl.add_row(unit_type=b.unit_type, units=b.units)
+        self.statusBar().showMessage(f"{len(blocks)} bloc(s) importé(s) depuis {folder}")
+
+    # ---------- Lecture du formulaire ----------
+    def _collect_inputs(self) -> dict:
+        """Arguments de build_study_plan d'après le formulaire."""
+        blocks = self.tbl.to_blocks()
+        # Exam profile
+        wt, wp, wm = self.w_theory.value(), self.w_prob.value(), self.w_mem.value()
+        total = max(1e-6, wt+wp+wm)
+        exam = ExamProfile(
+            weight_theory=wt/total, weight_problems=wp/total, weight_memorization=wm/total,
+            question_mix={
+                "QCM": self.mix_qcm.value(),
+                "problèmes": self.mix_prob.value(),
+                "rédaction": self.mix_red.value()
+            }
+        )
+        # User profile
+        user = UserProfile(
+            read_speed_page_min=self.v_page.value(),
+            read_speed_slide_min=self.v_slide.value(),
+            video_multiplier=self.v_video.value(),
+            notes_factor=self.notes_factor.value(),
+            language_penalty=self.lang_penalty.value(),
+            exercise_min_each=self.exo_min_each.value(),
+            problem_set_size=self.set_size.value(),
+            retention_sensitivity=self.retention.value(),
+            target_grade=self.target.value(),
+            current_mastery=self.mastery.value(),
+            fatigue_threshold_min=self.fatigue_threshold.value(),
+            fatigue_penalty=self.fatigue_penalty.value(),
+            availability_windows=parse_time_windows(self.windows.text()),
+            session_length_min=self.session_len.value(),
+            break_min=self.break_len.value()
+        )
+        # Constraints
+        holidays, ranges = parse_calendar_dates(self.holidays.text())
+        calendar = StudyCalendar(
+            blocked_weekdays=[i for i, cb in enumerate(self.blocked_weekdays) if cb.isChecked()],
+            blocked_ranges=ranges,
+            holidays=holidays
+        )
+        cons = Constraints(
+            days_available=self.days.value(),
+            max_minutes_per_day=self.max_day.value(),
+            min_minutes_per_day=self.min_day.value(),
+            blocked_days=None,
+            calendar=calendar
+        )
+        return dict(
+            contents=blocks, exam=exam, user=user, constraints=cons,
+            start_date=self.start_date.date().toPython(), want_mocks=self.want_mocks.isChecked(),
+            mock_duration_min=self.mock_dur.value(), mock_review_ratio=self.mock_ratio.value(),
+            coeffs=self.coeffs, with_sessions=self.want_sessions.isChecked()
+        )
 
     # ---------- Génération du plan ----------
     def generate_plan(self):
         try:
-            blocks = self.tbl.to_blocks()
-            if not blocks:
+            inputs = self._collect_inputs()
+            if not inputs["contents"]:
                 QMessageBox.warning(self, APP_NAME, "Ajoute au moins un bloc de contenu.")
                 return
-            # Exam profile
-            wt, wp, wm = self.w_theory.value(), self.w_prob.value(), self.w_mem.value()
-            total = max(1e-6, wt+wp+wm)
-            exam = ExamProfile(
-                weight_theory=wt/total, weight_problems=wp/total, weight_memorization=wm/total,
-                question_mix={
-                    "QCM": self.mix_qcm.value(),
-                    "problèmes": self.mix_prob.value(),
-                    "rédaction": self.mix_red.value()
-                }
-            )
-            # User profile
-            user = UserProfile(
-                read_speed_page_min=self.v_page.value(),
-                read_speed_slide_min=self.v_slide.value(),
-                video_multiplier=self.v_video.value(),
-                notes_factor=self.notes_factor.value(),
-                language_penalty=self.lang_penalty.value(),
-                exercise_min_each=self.exo_min_each.value(),
-                problem_set_size=self.set_size.value(),
-                retention_sensitivity=self.retention.value(),
-                target_grade=self.target.value(),
-                current_mastery=self.mastery.value()
-            )
-            # Constraints
-            cons = Constraints(
-                days_available=self.days.value(),
-                max_minutes_per_day=self.max_day.value(),
-                min_minutes_per_day=self.min_day.value(),
-                blocked_days=None
-            )
-            start = self.start_date.date().toPython()
-            plan = build_study_plan(
-                contents=blocks, exam=exam, user=user, constraints=cons,
-                start_date=start, want_mocks=self.want_mocks.isChecked(),
-                mock_duration_min=self.mock_dur.value(), mock_review_ratio=self.mock_ratio.value()
-            )
+            key = plan_key(**inputs)
+            plan = self.disk_cache.get(key)
+            if plan is None:
+                self.graph.update(**inputs)  # seules les phases touchées par les champs modifiés sont recalculées
+                plan = self.graph.result()
+                try:
+                    self.disk_cache.put(key, plan)
+                except OSError:
+                    pass
             self.plan_cache = plan
             # Résumé
             br = plan.breakdown
@@ -298,11 +380,18 @@ class MainWindow(QMainWindow):
                 f"<b>Examens blancs :</b> {br['mock']}"
             )
             self.lbl_summary.setText(summary)
-            # Tableau
+            # Tableau (les séances horaires, si demandées, en info-bulle du jour)
+            day_tips = {}
+            for ss in plan.sessions or []:
+                line = f"{format_clock(ss.start_min)}–{format_clock(ss.end_min)}  {KIND_LABELS[ss.kind]}"
+                day_tips.setdefault(ss.day_index, []).append(line if ss.in_window else line + " (hors plage)")
             self.tbl_plan.setRowCount(0)
             for it in plan.per_day:
                 r = self.tbl_plan.rowCount(); self.tbl_plan.insertRow(r)
-                self.tbl_plan.setItem(r, 0, QTableWidgetItem(str(it.day_index+1)))
+                day_item = QTableWidgetItem(str(it.day_index+1))
+                if it.day_index in day_tips:
+                    day_item.setToolTip("\n".join(day_tips[it.day_index]))
+                self.tbl_plan.setItem(r, 0, day_item)
                 self.tbl_plan.setItem(r, 1, QTableWidgetItem(it.date or "—"))
                 self.tbl_plan.setItem(r, 2, QTableWidgetItem(str(it.learn_min)))
                 self.tbl_plan.setItem(r, 3, QTableWidgetItem(str(it.exercises_min)))
@@ -312,6 +401,25 @@ class MainWindow(QMainWindow):
         except Exception as e:
             QMessageBox.critical(self, APP_NAME, f"Erreur: {e}")
 
+    # ---------- Sensibilité ----------
+    def show_sensitivity(self):
+        try:
+            inputs = self._collect_inputs()
+            if not inputs["contents"]:
+                QMessageBox.warning(self, APP_NAME, "Ajoute au moins un bloc de contenu.")
+                return
+            del inputs["start_date"], inputs["with_sessions"]
+            entries = sensitivity_report(**inputs)
+        except Exception as e:
+            QMessageBox.critical(self, APP_NAME, f"Erreur: {e}")
+            return
+        lines = [
+            f"{e.param} = {e.value:g} : +1% → {e.elasticity['total']:+.2f}% du total "
+            f"({e.derivative['total']:+.1f} min par unité)"
+            for e in entries[:SENSITIVITY_TOP] if e.elasticity["total"]
+        ]
+        QMessageBox.information(self, APP_NAME, "Paramètres les plus influents :\n\n" + "\n".join(lines))
+
     # ---------- Export CSV ----------
     def export_csv(self):
         if not self.plan_cache:
@@ -326,6 +434,18 @@ class MainWindow(QMainWindow):
                 w.writerow([it.day_index+1, it.date or "", it.learn_min, it.exercises_min, it.review_min, it.mock_min])
         self.statusBar().showMessage(f"Exporté: {path}")
 
+    # ---------- Export ICS (calendrier) ----------
+    def export_ics(self):
+        if not self.plan_cache:
+            QMessageBox.information(self, APP_NAME, "Génère d'abord un plan.")
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Exporter en ICS", "plan.ics", "iCalendar (*.ics)")
+        if not path: return
+        # UID stables d'un export à l'autre : identifiant du cours, sinon nom du fichier
+        course = self.course.text().strip()
+        write_ics(self.plan_cache, path, uid_prefix=course or Path(path).stem, title=APP_NAME)
+        self.statusBar().showMessage(f"Exporté: {path}")
+
     # ---------- Export PDF (simple) ----------
     def export_pdf(self):
         if not self.plan_cache:
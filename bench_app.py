@@ -0,0 +1,287 @@
+"""
+Banc de mesure de l'application (sans affichage)
+---------------------------------------------------
+Pilote MainWindow avec QT_QPA_PLATFORM=offscreen :
+  1. remplit ContentTable avec N lignes ;
+  2. lance generate_plan pour chaque horizon demandé (répétitions) ;
+  3. exécute les exports CSV / ICS / PDF (boîtes de dialogue neutralisées).
+
+Chaque étape est exécutée dans la boucle d'événements Qt ; un minuteur
+« battement de cœur » mesure les blocages de la boucle (écart entre deux
+battements au-delà de l'intervalle prévu). Mesures produites (JSON) :
+durée de l'appel, délai jusqu'au retour de la boucle (time_to_result),
+blocages, pic mémoire Python (tracemalloc) et RSS maximal du processus.
+
+Exemple :
+  python bench_app.py --rows 200 --days 30,180,365 --output bench_output.txt
+  python bench_app.py --baseline ancien.json   # code de sortie 1 si régression
+---------------------------------------------------
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from statistics import median
+from typing import Callable, Dict, List, Optional
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import PySide6
+from PySide6.QtCore import QEventLoop, QTimer, Qt
+from PySide6.QtWidgets import QApplication, QFileDialog, QMessageBox
+
+from app import UNIT_TYPES, MainWindow
+from plan_cache import PlanCache
+from study_planner import PlanGraph
+
+
+def _ms(t0: float) -> float:
+    return round((time.perf_counter() - t0) * 1000, 3)
+
+
+class StallMonitor:
+    """Battement de cœur dans la boucle Qt ; un écart anormal = boucle bloquée."""
+
+    def __init__(self, interval_ms: int, threshold_ms: float):
+        self.interval_ms = interval_ms
+        self.threshold_ms = threshold_ms
+        self.label: Optional[str] = None
+        self.stalls: Dict[str, List[float]] = {}
+        self._last = time.perf_counter()
+        self._timer = QTimer()
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.setInterval(interval_ms)
+        self._timer.timeout.connect(self._tick)
+
+    def start(self) -> None:
+        self.reset_clock()
+        self._timer.start()
+
+    def stop(self) -> None:
+        self._timer.stop()
+
+    def reset_clock(self) -> None:
+        self._last = time.perf_counter()
+
+    def _tick(self) -> None:
+        now = time.perf_counter()
+        late = (now - self._last) * 1000 - self.interval_ms
+        if late > self.threshold_ms and self.label is not None:
+            self.stalls.setdefault(self.label, []).append(round(late, 3))
+        self._last = now
+
+    def summary(self, label: str) -> dict:
+        stalls = self.stalls.get(label, [])
+        return {"count": len(stalls), "max_ms": max(stalls, default=0.0), "total_ms": round(sum(stalls), 3)}
+
+
+class AppBench:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.qapp = QApplication.instance() or QApplication(sys.argv[:1])
+        self.tmp = tempfile.TemporaryDirectory(prefix="bench_app_")
+        self.window = MainWindow()
+        self.window.resize(1100, 850)
+        self.window.show()
+        self.window.disk_cache = PlanCache(Path(self.tmp.name) / "cache")
+        self.monitor = StallMonitor(args.heartbeat_ms, args.stall_threshold_ms)
+        self.dialogs: List[dict] = []
+
+    # ---------- Exécution d'une étape dans la boucle ----------
+    def step(self, label: str, fn: Callable[[], object]) -> dict:
+        loop = QEventLoop()
+        out: dict = {"step": label}
+
+        def call():
+            self.monitor.label = label
+            if self.args.tracemalloc:
+                tracemalloc.reset_peak()
+            t0 = time.perf_counter()
+            out["value"] = fn()
+            out["call_ms"] = _ms(t0)
+
+            def returned():
+                out["time_to_result_ms"] = _ms(t0)   # la boucle a repris (mise en page, rendu)
+                QTimer.singleShot(self.args.settle_ms, loop.quit)
+            QTimer.singleShot(0, returned)
+
+        self.monitor.reset_clock()
+        QTimer.singleShot(0, call)
+        loop.exec()
+        self.monitor.label = None
+        out["stalls"] = self.monitor.summary(label)
+        if self.args.tracemalloc:
+            out["tracemalloc_peak_kb"] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        return out
+
+    # ---------- Scénario ----------
+    def fill_rows(self) -> dict:
+        rng = random.Random(self.args.seed)
+        tbl = self.window.tbl
+
+        def fill():
+            tbl.setRowCount(0)
+            for _ in range(self.args.rows):
+                unit_type = rng.choice(UNIT_TYPES)
+                tbl.add_row(unit_type=unit_type, units=rng.randint(5, 300),
+                            diff=round(rng.uniform(0.7, 1.3), 2), nov=round(rng.uniform(0.7, 1.3), 2))
+            return tbl.rowCount()
+        res = self.step(f"fill_{self.args.rows}_rows", fill)
+        res["rows"] = res.pop("value")
+        return res
+
+    def generate(self, days: int, repeat: int) -> dict:
+        w = self.window
+        w.days.setMaximum(max(w.days.maximum(), days))
+        w.days.setValue(days)
+        w.want_sessions.setChecked(self.args.sessions)
+        if not self.args.warm:
+            # Mesure à froid : ni cache disque ni graphe incrémental
+            w.disk_cache.clear()
+            w.graph = PlanGraph()
+
+        def run():
+            w.generate_plan()
+            return w.plan_cache
+        res = self.step(f"generate_{days}d_{repeat}", run)
+        plan = res.pop("value")
+        res.update(days=days, repeat=repeat,
+                   total_minutes=plan.total_minutes if plan else None,
+                   plan_rows=w.tbl_plan.rowCount())
+        return res
+
+    def export(self, kind: str) -> dict:
+        path = Path(self.tmp.name) / f"plan.{kind}"
+        if path.exists():
+            path.unlink()
+        action = {"csv": self.window.export_csv, "ics": self.window.export_ics, "pdf": self.window.export_pdf}[kind]
+        with self._patched_dialogs(str(path)):
+            res = self.step(f"export_{kind}", action)
+        res.pop("value")
+        res["bytes"] = path.stat().st_size if path.exists() else None
+        return res
+
+    def _patched_dialogs(self, save_path: str):
+        bench = self
+
+        class _Patch:
+            def __enter__(self):
+                self.saved = {name: getattr(QMessageBox, name) for name in ("information", "warning", "critical")}
+                self.saved_dialog = QFileDialog.getSaveFileName
+                for name in self.saved:
+                    setattr(QMessageBox, name, staticmethod(
+                        lambda _parent, _title, text, *a, _kind=name, **k:
+                        bench.dialogs.append({"kind": _kind, "text": text}) or QMessageBox.Ok))
+                QFileDialog.getSaveFileName = staticmethod(lambda *a, **k: (save_path, ""))
+
+            def __exit__(self, *exc):
+                for name, fn in self.saved.items():
+                    setattr(QMessageBox, name, fn)
+                QFileDialog.getSaveFileName = self.saved_dialog
+        return _Patch()
+
+    def run(self) -> dict:
+        if self.args.tracemalloc:
+            tracemalloc.start()
+        self.monitor.start()
+        results = {"fill": self.fill_rows(), "generate": [], "exports": {}}
+        with self._patched_dialogs(os.devnull):   # generate_plan peut ouvrir une boîte d'erreur
+            for days in self.args.days:
+                for r in range(self.args.repeats):
+                    results["generate"].append(self.generate(days, r))
+        for kind in self.args.exports:
+            results["exports"][kind] = self.export(kind)
+        self.monitor.stop()
+        if self.args.tracemalloc:
+            tracemalloc.stop()
+
+        results["summary"] = {
+            str(days): {
+                "median_time_to_result_ms": median(g["time_to_result_ms"] for g in results["generate"]
+                                                   if g["days"] == days),
+                "max_stall_ms": max(g["stalls"]["max_ms"] for g in results["generate"] if g["days"] == days),
+            }
+            for days in self.args.days
+        }
+        # ru_maxrss : kilo-octets sous Linux
+        results["max_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        results["dialogs"] = self.dialogs
+        results["meta"] = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "pyside6": PySide6.__version__,
+            "platform": platform.platform(),
+            "qpa": os.environ.get("QT_QPA_PLATFORM"),
+            "rows": self.args.rows,
+            "days": self.args.days,
+            "repeats": self.args.repeats,
+            "sessions": self.args.sessions,
+            "warm": self.args.warm,
+            "heartbeat_ms": self.args.heartbeat_ms,
+            "stall_threshold_ms": self.args.stall_threshold_ms,
+            "tracemalloc": self.args.tracemalloc,
+        }
+        self.window.close()
+        self.tmp.cleanup()
+        return results
+
+
+def compare_to_baseline(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Horizons dont le temps médian dépasse celui de la référence de plus de `tolerance`."""
+    regressions = []
+    for days, cur in results["summary"].items():
+        ref = baseline.get("summary", {}).get(days)
+        if not ref:
+            continue
+        limit = ref["median_time_to_result_ms"] * (1 + tolerance)
+        if cur["median_time_to_result_ms"] > limit:
+            regressions.append(f"{days} jours : {cur['median_time_to_result_ms']:.1f} ms "
+                               f"> {limit:.1f} ms (référence {ref['median_time_to_result_ms']:.1f} ms)")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Mesure de réactivité de l'application (sans affichage)")
+    parser.add_argument("--rows", type=int, default=100, help="lignes de contenu à ajouter")
+    parser.add_argument("--days", type=lambda s: [int(x) for x in s.split(",")], default=[30, 180, 365],
+                        help="horizons à planifier, séparés par des virgules")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--sessions", action="store_true", help="découper en séances horaires")
+    parser.add_argument("--warm", action="store_true", help="garder cache disque et graphe entre répétitions")
+    parser.add_argument("--exports", type=lambda s: [x for x in s.split(",") if x], default=["csv", "ics", "pdf"])
+    parser.add_argument("--heartbeat-ms", type=int, default=5)
+    parser.add_argument("--stall-threshold-ms", type=float, default=50.0)
+    parser.add_argument("--settle-ms", type=int, default=50, help="attente après chaque étape")
+    parser.add_argument("--no-tracemalloc", dest="tracemalloc", action="store_false",
+                        help="désactiver tracemalloc (moins de surcoût sur les temps)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="-", help="fichier JSON (- = sortie standard)")
+    parser.add_argument("--baseline", help="résultats de référence (JSON) à comparer")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="marge de régression (0.25 = +25%%)")
+    args = parser.parse_args(argv)
+
+    results = AppBench(args).run()
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            results["regressions"] = compare_to_baseline(results, json.load(f), args.tolerance)
+
+    text = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    return 1 if results.get("regressions") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
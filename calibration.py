@@ -0,0 +1,274 @@
+"""
+Calibration hors ligne des coefficients du moteur
+---------------------------------------------------
+Ajuste les constantes de study_planner (UNIT_BASE_MIN, poids du mix de
+questions, facteurs problèmes/écart, fractions de révision) sur un historique
+de sessions, en une seule passe et en mémoire bornée : le journal est lu par
+paquets et seules les équations normales (XᵀX, Xᵀy) sont accumulées.
+
+Format du journal (CSV ou Parquet), une ligne par observation, colonne `phase` :
+  - learn     : unit_type, units, difficulty, novelty, density, user_speed,
+                notes_factor, language_penalty, minutes
+                (user_speed = valeur du champ UserProfile déclaré par le type
+                dans UNIT_TYPE_REGISTRY ; ignorée pour les types sans vitesse perso)
+  - exercises : mix_qcm, mix_problems, mix_redaction, weight_problems, gap,
+                exercise_min_each, problem_set_size, explicit_exo_units, minutes
+  - review    : initial_minutes, retention_sensitivity, days_available, minutes
+
+Usage : python calibration.py historique.csv -o coefficients.json
+---------------------------------------------------
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterator, List, Sequence
+
+import numpy as np
+
+from study_planner import Coefficients, UNIT_TYPE_REGISTRY, save_coefficients
+
+MIX_KEYS = ["problèmes", "rédaction", "QCM"]
+MIX_COLUMNS = ["mix_problems", "mix_redaction", "mix_qcm"]
+UNIT_KEYS = list(UNIT_TYPE_REGISTRY)
+
+
+class NormalEquations:
+    """Accumulateur XᵀX / Xᵀy pour une régression linéaire par paquets."""
+
+    def __init__(self, n_features: int):
+        self.xtx = np.zeros((n_features, n_features))
+        self.xty = np.zeros(n_features)
+        self.n = 0
+
+    def update(self, X: np.ndarray, y: np.ndarray) -> None:
+        if len(y) == 0:
+            return
+        self.xtx += X.T @ X
+        self.xty += X.T @ y
+        self.n += len(y)
+
+    def merge(self, other: "NormalEquations") -> None:
+        self.xtx += other.xtx
+        self.xty += other.xty
+        self.n += other.n
+
+    def solve(self) -> np.ndarray:
+        return np.linalg.lstsq(self.xtx, self.xty, rcond=None)[0]
+
+
+# =========================
+#   Lecture par paquets
+# =========================
+
+def _iter_chunks(path: Path, chunk_size: int) -> Iterator[Dict[str, Sequence]]:
+    """Renvoie le journal par paquets de colonnes {nom: valeurs}."""
+    if path.suffix.lower() == ".parquet":
+        import pyarrow.parquet as pq  # dépendance optionnelle
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            # colonnes directement en tableaux NumPy (valeurs nulles -> NaN), sans objets Python
+            yield {name: batch.column(i).to_numpy(zero_copy_only=False)
+                   for i, name in enumerate(batch.schema.names)}
+        return
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        width = len(header)
+        while True:
+            rows = list(islice(reader, chunk_size))
+            if not rows:
+                return
+            # lignes courtes/longues ramenées à la largeur de l'en-tête (champs manquants = vides)
+            rows = [r if len(r) == width else (r + [""] * width)[:width] for r in rows]
+            yield dict(zip(header, map(list, zip(*rows))))
+
+
+TEXT_COLUMNS = ("phase", "unit_type")
+# Colonnes lues par _learn_features, _exercise_features et _review_features
+NUMERIC_COLUMNS = frozenset([
+    "units", "user_speed", "density", "difficulty", "novelty", "notes_factor", "language_penalty",
+    *MIX_COLUMNS, "weight_problems", "gap", "exercise_min_each", "problem_set_size", "explicit_exo_units",
+    "initial_minutes", "retention_sensitivity", "days_available", "minutes",
+])
+
+
+def _to_arrays(cols: Dict[str, Sequence]) -> Dict[str, np.ndarray]:
+    """
+    Colonnes utiles du paquet converties une seule fois (cellules vides -> NaN).
+    Les autres (identifiants, horodatages...) sont ignorées.
+    """
+    arrays = {}
+    for name, values in cols.items():
+        if name in TEXT_COLUMNS:
+            arrays[name] = np.asarray(values, dtype=str)
+            continue
+        if name not in NUMERIC_COLUMNS:
+            continue
+        if len(values) and isinstance(values[0], str):
+            # CSV : conversion texte -> flottant en un appel NumPy, sur les seules cellules remplies
+            raw = np.asarray(values, dtype=object)
+            filled = raw != ""
+            arrays[name] = np.full(len(raw), np.nan)
+            arrays[name][filled] = raw[filled].astype(float)
+        else:
+            arrays[name] = np.asarray(values, dtype=float)   # Parquet : None -> NaN
+    return arrays
+
+
+def _num(arrays: Dict[str, np.ndarray], name: str, mask: np.ndarray) -> np.ndarray:
+    values = arrays.get(name)
+    if values is None:
+        return np.full(int(mask.sum()), np.nan)
+    return values[mask]
+
+
+# =========================
+#   Construction des features
+# =========================
+
+def _user_scale(unit_types: np.ndarray, speed: np.ndarray) -> np.ndarray:
+    """Même normalisation que unit_multiplier_table (1 pour les types sans vitesse perso)."""
+    scale = np.ones(len(unit_types))
+    for name, unit in UNIT_TYPE_REGISTRY.items():
+        if unit.user_field is not None:
+            mask = unit_types == name
+            scale[mask] = speed[mask] / unit.user_reference
+    return scale
+
+
+def _learn_features(cols, mask):
+    unit_types = cols["unit_type"][mask]
+    x = (_num(cols, "units", mask)
+         * _user_scale(unit_types, _num(cols, "user_speed", mask))
+         * _num(cols, "density", mask) * _num(cols, "difficulty", mask) * _num(cols, "novelty", mask)
+         * _num(cols, "notes_factor", mask) * _num(cols, "language_penalty", mask))
+    X = np.zeros((len(x), len(UNIT_KEYS)))
+    for j, t in enumerate(UNIT_KEYS):
+        X[:, j] = np.where(unit_types == t, x, 0.0)
+    return X, _num(cols, "minutes", mask)
+
+
+def _exercise_features(cols, mask):
+    # minutes / (min_each * set * bonus) = (Σ w_q q) * (a + b wp) * (1 + g gap)
+    # => modèle linéaire sur les 12 produits q_i * {1, wp} * {1, gap}
+    mix = np.stack([_num(cols, c, mask) for c in MIX_COLUMNS], axis=1)
+    wp = _num(cols, "weight_problems", mask)
+    gap = _num(cols, "gap", mask)
+    set_size = _num(cols, "problem_set_size", mask)
+    bonus = 1.0 + np.minimum(0.5, _num(cols, "explicit_exo_units", mask) / np.maximum(1, set_size) * 0.3)
+    y = _num(cols, "minutes", mask) / (_num(cols, "exercise_min_each", mask) * set_size * bonus)
+    wp_terms = np.stack([np.ones_like(wp), wp], axis=1)
+    gap_terms = np.stack([np.ones_like(gap), gap], axis=1)
+    X = np.einsum("ni,nj,nk->nijk", mix, wp_terms, gap_terms).reshape(len(y), 12)
+    return X, y
+
+
+def _review_bucket(days: np.ndarray) -> np.ndarray:
+    return np.select([days <= 2, days <= 5, days <= 10], [0, 1, 2], default=3)
+
+
+def _review_features(cols, mask):
+    x = _num(cols, "initial_minutes", mask) * _num(cols, "retention_sensitivity", mask)
+    bucket = _review_bucket(_num(cols, "days_available", mask))
+    X = np.zeros((len(x), 4))
+    X[np.arange(len(x)), bucket] = x
+    return X, _num(cols, "minutes", mask)
+
+
+# =========================
+#   Ajustement
+# =========================
+
+class CoefficientFitter:
+    """Accumule les trois sous-modèles (apprentissage, exercices, révision)."""
+
+    def __init__(self):
+        self.learn = NormalEquations(len(UNIT_KEYS))
+        self.exercises = NormalEquations(12)
+        self.review = NormalEquations(4)
+
+    def update(self, cols: Dict[str, Sequence]) -> None:
+        cols = _to_arrays(cols)
+        phase = cols["phase"]
+        for name, acc, build in (("learn", self.learn, _learn_features),
+                                 ("exercises", self.exercises, _exercise_features),
+                                 ("review", self.review, _review_features)):
+            mask = phase == name
+            if not mask.any():
+                continue
+            X, y = build(cols, mask)
+            ok = np.isfinite(X).all(axis=1) & np.isfinite(y)
+            acc.update(X[ok], y[ok])
+
+    def merge(self, other: "CoefficientFitter") -> None:
+        self.learn.merge(other.learn)
+        self.exercises.merge(other.exercises)
+        self.review.merge(other.review)
+
+    def coefficients(self) -> Coefficients:
+        """Coefficients calibrés ; les parties sans données gardent les valeurs par défaut."""
+        coeffs = Coefficients()
+
+        if self.learn.n:
+            beta = self.learn.solve()
+            for j, t in enumerate(UNIT_KEYS):
+                if self.learn.xtx[j, j] > 0:
+                    coeffs.unit_base_min[t] = float(beta[j])
+
+        if self.review.n:
+            beta = self.review.solve()
+            coeffs.review_fractions = [float(beta[j]) if self.review.xtx[j, j] > 0 else f
+                                       for j, f in enumerate(coeffs.review_fractions)]
+
+        if self.exercises.n:
+            _factor_exercise_terms(self.exercises.solve(), coeffs)
+
+        return coeffs
+
+
+def _factor_exercise_terms(beta: np.ndarray, coeffs: Coefficients) -> None:
+    """Projette les 12 termes ajustés sur le produit mix × (a + b·wp) × (1 + g·gap)."""
+    T = beta.reshape(3, 2, 2)
+    M0, M1 = T[:, :, 0], T[:, :, 1]
+    norm = float((M0 * M0).sum())
+    if norm <= 0:
+        return
+    g = float((M1 * M0).sum()) / norm
+    u, s, vt = np.linalg.svd((M0 + g * M1) / (1.0 + g * g))
+    mix, w = u[:, 0] * s[0], vt[0]
+    if mix[0] == 0:
+        return
+    # Normalisation : poids « problèmes » = 1, l'échelle passe dans (a, b)
+    w = w * mix[0]
+    mix = mix / mix[0]
+    coeffs.question_mix_weights = {k: float(v) for k, v in zip(MIX_KEYS, mix)}
+    coeffs.weight_problems_base = float(w[0])
+    coeffs.weight_problems_slope = float(w[1])
+    coeffs.gap_slope = g
+
+
+def fit_coefficients(path: str, chunk_size: int = 100_000) -> Coefficients:
+    fitter = CoefficientFitter()
+    for cols in _iter_chunks(Path(path), chunk_size):
+        fitter.update(cols)
+    return fitter.coefficients()
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Calibre les coefficients du planificateur sur un historique.")
+    parser.add_argument("log", help="journal de sessions (.csv ou .parquet)")
+    parser.add_argument("-o", "--output", default="coefficients.json")
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    args = parser.parse_args(argv)
+
+    coeffs = fit_coefficients(args.log, args.chunk_size)
+    save_coefficients(coeffs, args.output)
+    print(f"Coefficients enregistrés : {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Statistiques de cohorte en flux (mémoire bornée)
+---------------------------------------------------
+Les plans sont consommés un par un ; seuls des agrégats en ligne sont gardés :
+moyenne/variance (Welford), quantiles approchés (sketch logarithmique à erreur
+relative bornée, fusionnable), charge par jour d'horizon et part des catégories.
+Deux agrégats partiels (ex: un par processus) se combinent avec merge().
+---------------------------------------------------
+"""
+from __future__ import annotations
+
+from math import ceil, log
+from typing import Dict, Iterable, List, Optional
+
+from study_planner import PlanResult
+
+CATEGORIES = ["learn", "exercises", "review", "mock"]
+LOAD_BIN_MIN = 30   # largeur des classes de l'histogramme de charge journalière
+
+
+class RunningStats:
+    """Moyenne / variance de Welford, fusion de Chan."""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def add(self, x: float) -> None:
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+        self.min = x if self.min is None else min(self.min, x)
+        self.max = x if self.max is None else max(self.max, x)
+
+    def merge(self, other: "RunningStats") -> None:
+        if other.n == 0:
+            return
+        if self.n == 0:
+            self.n, self.mean, self.m2, self.min, self.max = other.n, other.mean, other.m2, other.min, other.max
+            return
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self.m2 += other.m2 + delta * delta * self.n * other.n / n
+        self.n = n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.n - 1) if self.n > 1 else 0.0
+
+    def summary(self) -> Dict[str, float]:
+        return {"n": self.n, "mean": self.mean, "std": self.variance ** 0.5, "min": self.min, "max": self.max}
+
+
+class QuantileSketch:
+    """
+    Quantiles à erreur relative `relative_accuracy` : classes géométriques de
+    raison gamma = (1+a)/(1-a). Fusion exacte par somme des compteurs.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = log(self._gamma)
+        self.counts: Dict[int, int] = {}
+        self.zeros = 0
+        self.n = 0
+
+    def add(self, x: float) -> None:
+        self.n += 1
+        if x <= 0:
+            self.zeros += 1
+            return
+        k = ceil(log(x) / self._log_gamma)
+        self.counts[k] = self.counts.get(k, 0) + 1
+
+    def merge(self, other: "QuantileSketch") -> None:
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Sketches de précisions différentes")
+        for k, c in other.counts.items():
+            self.counts[k] = self.counts.get(k, 0) + c
+        self.zeros += other.zeros
+        self.n += other.n
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.n == 0:
+            return None
+        rank = q * (self.n - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for k in sorted(self.counts):
+            seen += self.counts[k]
+            if rank < seen:
+                return 2 * self._gamma ** k / (self._gamma + 1)   # centre de la classe
+        return 2 * self._gamma ** max(self.counts) / (self._gamma + 1)
+
+
+class CohortAggregator:
+    """Agrégats d'un flux de PlanResult."""
+
+    QUANTILES = (0.1, 0.5, 0.9, 0.99)
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.total = RunningStats()
+        self.total_sketch = QuantileSketch(relative_accuracy)
+        self.peak = RunningStats()
+        self.peak_sketch = QuantileSketch(relative_accuracy)
+        self.category_minutes = {c: 0 for c in CATEGORIES}
+        self.day_load: List[RunningStats] = []     # charge par jour d'horizon (indice)
+        self.day_at_cap: List[int] = []            # nb de plans au plafond ce jour-là
+        self.load_histogram: Dict[int, int] = {}   # classe de LOAD_BIN_MIN minutes -> nb de jours
+        self.working_days = 0
+        self.capped_days = 0
+        self.plans_with_capped_day = 0
+
+    def add(self, plan: PlanResult) -> None:
+        self.total.add(plan.total_minutes)
+        self.total_sketch.add(plan.total_minutes)
+        for c in CATEGORIES:
+            self.category_minutes[c] += plan.breakdown[c]
+
+        cap = plan.params_used.get("max_minutes_per_day")
+        peak = 0
+        any_capped = False
+        if len(self.day_load) < len(plan.per_day):
+            missing = len(plan.per_day) - len(self.day_load)
+            self.day_load.extend(RunningStats() for _ in range(missing))
+            self.day_at_cap.extend([0] * missing)
+        for it in plan.per_day:
+            load = it.learn_min + it.exercises_min + it.review_min + it.mock_min
+            self.day_load[it.day_index].add(load)
+            peak = max(peak, load)
+            if load > 0:
+                self.working_days += 1
+                b = load // LOAD_BIN_MIN
+                self.load_histogram[b] = self.load_histogram.get(b, 0) + 1
+            if cap is not None and load >= cap:
+                self.day_at_cap[it.day_index] += 1
+                self.capped_days += 1
+                any_capped = True
+        self.peak.add(peak)
+        self.peak_sketch.add(peak)
+        self.plans_with_capped_day += any_capped
+
+    def merge(self, other: "CohortAggregator") -> None:
+        self.total.merge(other.total)
+        self.total_sketch.merge(other.total_sketch)
+        self.peak.merge(other.peak)
+        self.peak_sketch.merge(other.peak_sketch)
+        for c in CATEGORIES:
+            self.category_minutes[c] += other.category_minutes[c]
+        for i, stats in enumerate(other.day_load):
+            if i < len(self.day_load):
+                self.day_load[i].merge(stats)
+                self.day_at_cap[i] += other.day_at_cap[i]
+            else:
+                mine = RunningStats()
+                mine.merge(stats)
+                self.day_load.append(mine)
+                self.day_at_cap.append(other.day_at_cap[i])
+        for b, c in other.load_histogram.items():
+            self.load_histogram[b] = self.load_histogram.get(b, 0) + c
+        self.working_days += other.working_days
+        self.capped_days += other.capped_days
+        self.plans_with_capped_day += other.plans_with_capped_day
+
+    def summary(self) -> dict:
+        """Rapport compact (sérialisable en JSON)."""
+        n = self.total.n
+        all_minutes = sum(self.category_minutes.values())
+        return {
+            "plans": n,
+            "total_minutes": {**self.total.summary(),
+                              **{f"p{int(q*100)}": self.total_sketch.quantile(q) for q in self.QUANTILES}},
+            "peak_day_minutes": {**self.peak.summary(),
+                                 **{f"p{int(q*100)}": self.peak_sketch.quantile(q) for q in self.QUANTILES}},
+            "category_share": {c: (m / all_minutes if all_minutes else 0.0) for c, m in self.category_minutes.items()},
+            "capped_day_rate": self.capped_days / self.working_days if self.working_days else 0.0,
+            "plans_with_capped_day": self.plans_with_capped_day / n if n else 0.0,
+            "mean_load_by_day": [round(s.mean, 1) for s in self.day_load],
+            "cap_rate_by_day": [c / s.n if s.n else 0.0 for c, s in zip(self.day_at_cap, self.day_load)],
+            "load_histogram": {f"{b*LOAD_BIN_MIN}-{(b+1)*LOAD_BIN_MIN}": c
+                               for b, c in sorted(self.load_histogram.items())},
+        }
+
+
+def aggregate(plans: Iterable[PlanResult], relative_accuracy: float = 0.01) -> CohortAggregator:
+    agg = CohortAggregator(relative_accuracy)
+    for plan in plans:
+        agg.add(plan)
+    return agg
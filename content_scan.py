@@ -0,0 +1,479 @@
+"""
+Dimensionnement automatique du contenu à partir d'un dossier de cours
+---------------------------------------------------
+- PDF  : /Count de la racine de l'arbre des pages, atteinte par startxref ->
+         trailer -> /Root -> /Pages (tables et flux de références, flux d'objets,
+         mises à jour incrémentales) via une lecture mmap ; si la structure est
+         illisible, repli sur un balayage des nœuds /Type /Pages
+- PPTX : nombre de slides d'après les entrées ppt/slides/slideN.xml du zip
+- MP4/MOV/M4V : durée lue dans l'en-tête moov/mvhd, sans décodage
+
+Les fichiers sont analysés dans un pool de threads et les résultats sont mis
+en cache par (chemin, mtime, taille) : un nouveau scan du même dossier ne
+relit que les fichiers modifiés.
+---------------------------------------------------
+"""
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import re
+import struct
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from math import ceil
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from study_planner import ContentBlock
+
+DEFAULT_CACHE_PATH = Path.home() / ".cache" / "planificateur_etude" / "scan.json"
+
+_PAGES_TYPE = re.compile(rb"/Type\s*/Pages\b")
+_PAGE_TYPE = re.compile(rb"/Type\s*/Page\b")
+_OBJSTM_TYPE = re.compile(rb"/Type\s*/ObjStm\b")
+_COUNT = re.compile(rb"/Count\s+(\d+)")
+_REF = rb"\s+(\d+)\s+\d+\s+R"
+_ROOT_REF = re.compile(rb"/Root" + _REF)
+_PAGES_REF = re.compile(rb"/Pages" + _REF)
+_COUNT_REF = re.compile(rb"/Count" + _REF)
+_PREV = re.compile(rb"/Prev\s+(\d+)")
+_XREF_STM = re.compile(rb"/XRefStm\s+(\d+)")
+_STARTXREF = re.compile(rb"startxref\s+(\d+)")
+_XREF_SUBSECTION = re.compile(rb"\s*(\d+)\s+(\d+)[ \t]*\r?\n")
+_XREF_ENTRY = re.compile(rb"\s*(\d{10})\s+(\d{5})\s+([nf])")
+_TRAILER = re.compile(rb"\s*trailer")
+_OBJ_HEADER = re.compile(rb"\s*(\d+)\s+\d+\s+obj\b")
+_INT = re.compile(rb"\s*(\d+)")
+_W = re.compile(rb"/W\s*\[\s*(\d+)\s+(\d+)\s+(\d+)\s*\]")
+_INDEX = re.compile(rb"/Index\s*\[([\d\s]*)\]")
+_SIZE = re.compile(rb"/Size\s+(\d+)")
+_FIRST = re.compile(rb"/First\s+(\d+)")
+_PREDICTOR = re.compile(rb"/Predictor\s+(\d+)")
+_COLUMNS = re.compile(rb"/Columns\s+(\d+)")
+_SLIDE_ENTRY = re.compile(r"ppt/slides/slide\d+\.xml$")
+
+
+@dataclass
+class ScannedFile:
+    path: str
+    unit_type: str
+    units: int
+
+
+# =========================
+#   Lecteurs par format
+# =========================
+
+def _enclosing_dict(buf, pos: int) -> Tuple[int, int]:
+    """Bornes du dictionnaire << ... >> qui contient `pos`."""
+    depth, lo = 0, pos
+    while lo > 1:
+        lo -= 1
+        pair = buf[lo-1:lo+1]
+        if pair == b">>":
+            depth += 1
+            lo -= 1
+        elif pair == b"<<":
+            if depth == 0:
+                lo -= 1
+                break
+            depth -= 1
+            lo -= 1
+    depth, hi = 0, pos
+    while hi < len(buf) - 1:
+        pair = buf[hi:hi+2]
+        if pair == b"<<":
+            depth += 1
+            hi += 1
+        elif pair == b">>":
+            if depth == 0:
+                hi += 2
+                break
+            depth -= 1
+            hi += 1
+        hi += 1
+    return lo, hi
+
+
+def _root_page_count(buf) -> int:
+    """Heuristique : plus grand /Count parmi les nœuds /Type /Pages."""
+    best = 0
+    for m in _PAGES_TYPE.finditer(buf):
+        lo, hi = _enclosing_dict(buf, m.start())
+        count = _COUNT.search(buf, lo, hi)
+        if count:
+            best = max(best, int(count.group(1)))
+    return best
+
+
+def _search(pattern: "re.Pattern", data) -> "re.Match":
+    m = pattern.search(data)
+    if m is None:
+        raise ValueError(f"PDF: {pattern.pattern!r} introuvable")
+    return m
+
+
+def _dict_at(buf, pos: int) -> Tuple[int, int]:
+    """Bornes du premier dictionnaire << ... >> à partir de `pos`."""
+    lo = buf.find(b"<<", pos)
+    if lo < 0:
+        raise ValueError("PDF: dictionnaire introuvable")
+    depth, i = 0, lo
+    while i < len(buf) - 1:
+        pair = buf[i:i+2]
+        if pair == b"<<":
+            depth += 1
+            i += 2
+        elif pair == b">>":
+            depth -= 1
+            i += 2
+            if depth == 0:
+                return lo, i
+        else:
+            i += 1
+    raise ValueError("PDF: dictionnaire non fermé")
+
+
+def _png_unpredict(data: bytes, columns: int) -> bytes:
+    """Inverse les prédicteurs PNG (/Predictor >= 10), 1 octet par composante."""
+    out = bytearray()
+    prev = bytearray(columns)
+    for i in range(0, len(data) - columns, columns + 1):
+        kind, row = data[i], bytearray(data[i+1:i+1+columns])
+        for j in range(columns):
+            left = row[j-1] if j else 0
+            up, up_left = prev[j], (prev[j-1] if j else 0)
+            if kind == 1:
+                row[j] = (row[j] + left) & 0xFF
+            elif kind == 2:
+                row[j] = (row[j] + up) & 0xFF
+            elif kind == 3:
+                row[j] = (row[j] + (left + up) // 2) & 0xFF
+            elif kind == 4:
+                p = left + up - up_left
+                pa, pb, pc = abs(p - left), abs(p - up), abs(p - up_left)
+                row[j] = (row[j] + (left if pa <= pb and pa <= pc else up if pb <= pc else up_left)) & 0xFF
+        out += row
+        prev = row
+    return bytes(out)
+
+
+def _stream_data(buf, dict_end: int, head: bytes) -> bytes:
+    """Contenu décodé du flux qui suit un dictionnaire (FlateDecode seulement)."""
+    start = buf.find(b"stream", dict_end)
+    if start < 0:
+        raise ValueError("PDF: flux introuvable")
+    start += 6
+    start += 2 if buf[start:start+2] == b"\r\n" else 1
+    end = buf.find(b"endstream", start)
+    raw = buf[start:end if end > 0 else len(buf)]
+    if b"/Filter" in head:
+        if b"/FlateDecode" not in head:
+            raise ValueError("PDF: filtre non pris en charge")
+        raw = zlib.decompressobj().decompress(raw)
+    predictor = _PREDICTOR.search(head)
+    if predictor and int(predictor.group(1)) >= 10:
+        columns = _COLUMNS.search(head)
+        raw = _png_unpredict(raw, int(columns.group(1)) if columns else 1)
+    return bytes(raw)
+
+
+class _PdfXref:
+    """
+    Références croisées d'un PDF : numéro d'objet -> offset, (flux d'objets, rang)
+    ou None (objet libéré). Les sections sont lues de la plus récente (startxref)
+    aux plus anciennes (/Prev) : une mise à jour incrémentale masque les anciennes entrées.
+    """
+
+    def __init__(self, buf):
+        self.buf = buf
+        self.entries: Dict[int, object] = {}
+        self.root: Optional[int] = None
+        self._objstm: Dict[int, Tuple[bytes, List[int], int]] = {}
+        tail = buf.rfind(b"startxref", max(0, len(buf) - 4096))
+        if tail < 0:
+            raise ValueError("PDF: startxref introuvable")
+        pending, seen = [int(_STARTXREF.match(buf, tail).group(1))], set()
+        while pending:
+            pos = pending.pop()
+            if pos in seen:
+                continue
+            seen.add(pos)
+            trailer = self._read_section(pos)
+            if self.root is None:
+                root = _ROOT_REF.search(trailer)
+                self.root = int(root.group(1)) if root else None
+            # /XRefStm (fichiers hybrides) avant /Prev : dépiler dans l'ordre de priorité
+            for key in (_PREV, _XREF_STM):
+                m = key.search(trailer)
+                if m:
+                    pending.append(int(m.group(1)))
+        if self.root is None:
+            raise ValueError("PDF: /Root introuvable")
+
+    def _read_section(self, pos: int) -> bytes:
+        """Lit une section (table « xref » ou flux /XRef) ; renvoie son dictionnaire de trailer."""
+        if self.buf[pos:pos+4] == b"xref":
+            return self._read_table(pos + 4)
+        return self._read_stream(pos)
+
+    def _read_table(self, pos: int) -> bytes:
+        while True:
+            m = _XREF_SUBSECTION.match(self.buf, pos)
+            if m is None:
+                break
+            first, n = int(m.group(1)), int(m.group(2))
+            pos = m.end()
+            for k in range(n):
+                e = _XREF_ENTRY.match(self.buf, pos)
+                if e is None:
+                    raise ValueError("PDF: table xref invalide")
+                pos = e.end()
+                self.entries.setdefault(first + k, int(e.group(1)) if e.group(3) == b"n" else None)
+        m = _TRAILER.match(self.buf, pos)
+        if m is None:
+            raise ValueError("PDF: trailer introuvable")
+        lo, hi = _dict_at(self.buf, m.end())
+        return bytes(self.buf[lo:hi])
+
+    def _read_stream(self, pos: int) -> bytes:
+        m = _OBJ_HEADER.match(self.buf, pos)
+        if m is None:
+            raise ValueError("PDF: flux xref introuvable")
+        lo, hi = _dict_at(self.buf, m.end())
+        head = bytes(self.buf[lo:hi])
+        data = _stream_data(self.buf, hi, head)
+        widths = [int(x) for x in _search(_W, head).groups()]
+        index = _INDEX.search(head)
+        bounds = ([int(x) for x in index.group(1).split()] if index
+                  else [0, int(_search(_SIZE, head).group(1))])
+        row, j = sum(widths), 0
+        for first, n in zip(bounds[::2], bounds[1::2]):
+            for k in range(n):
+                rec = data[j*row:(j+1)*row]
+                if len(rec) < row:
+                    raise ValueError("PDF: flux xref tronqué")
+                j += 1
+                fields, p = [], 0
+                for w in widths:
+                    fields.append(int.from_bytes(rec[p:p+w], "big"))
+                    p += w
+                kind = fields[0] if widths[0] else 1
+                if kind == 0:
+                    self.entries.setdefault(first + k, None)
+                elif kind == 1:
+                    self.entries.setdefault(first + k, fields[1])
+                elif kind == 2:
+                    self.entries.setdefault(first + k, (fields[1], fields[2]))
+        return head
+
+    def locate(self, num: int) -> Tuple[object, int]:
+        """(tampon, position) du corps de l'objet `num`."""
+        entry = self.entries.get(num)
+        if entry is None:
+            raise ValueError(f"PDF: objet {num} absent")
+        if isinstance(entry, int):
+            m = _OBJ_HEADER.match(self.buf, entry)
+            if m is None or int(m.group(1)) != num:
+                raise ValueError(f"PDF: offset de l'objet {num} invalide")
+            return self.buf, m.end()
+        stm, rank = entry
+        if stm not in self._objstm:
+            buf, pos = self.locate(stm)
+            lo, hi = _dict_at(buf, pos)
+            head = bytes(buf[lo:hi])
+            data = _stream_data(buf, hi, head)
+            first = int(_search(_FIRST, head).group(1))
+            self._objstm[stm] = (data, [int(x) for x in data[:first].split()], first)
+        data, pairs, first = self._objstm[stm]
+        if pairs[2*rank] != num:
+            raise ValueError(f"PDF: objet {num} absent du flux {stm}")
+        return data, first + pairs[2*rank + 1]
+
+    def dictionary(self, num: int) -> bytes:
+        buf, pos = self.locate(num)
+        lo, hi = _dict_at(buf, pos)
+        return bytes(buf[lo:hi])
+
+    def integer(self, num: int) -> int:
+        buf, pos = self.locate(num)
+        return int(_INT.match(buf, pos).group(1))
+
+
+def _page_tree_count(buf) -> int:
+    """/Count de la racine de l'arbre des pages : trailer -> /Root -> /Pages."""
+    xref = _PdfXref(buf)
+    catalog = xref.dictionary(xref.root)
+    pages = xref.dictionary(int(_search(_PAGES_REF, catalog).group(1)))
+    ref = _COUNT_REF.search(pages)
+    return xref.integer(int(ref.group(1))) if ref else int(_search(_COUNT, pages).group(1))
+
+
+def pdf_page_count(path: str) -> Optional[int]:
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        try:
+            count = _page_tree_count(mm)
+        except (ValueError, IndexError, AttributeError, zlib.error):
+            count = 0
+        if count:
+            return count
+        # Repli (structure illisible : fichier réparé à la main, xref erronée...) : balayage heuristique
+        best = _root_page_count(mm)
+        if best:
+            return best
+        # PDF 1.5+ : l'arbre est souvent dans des flux d'objets ; on ne décompresse que ceux-là
+        for m in _OBJSTM_TYPE.finditer(mm):
+            start = mm.find(b"stream", m.end())
+            if start < 0:
+                continue
+            start += 6
+            start += 2 if mm[start:start+2] == b"\r\n" else 1
+            end = mm.find(b"endstream", start)
+            try:
+                data = zlib.decompressobj().decompress(mm[start:end if end > 0 else len(mm)])
+            except zlib.error:
+                continue
+            best = max(best, _root_page_count(data))
+        if best:
+            return best
+        # Dernier recours : compter les feuilles /Type /Page non compressées
+        return sum(1 for _ in _PAGE_TYPE.finditer(mm)) or None
+
+
+def pptx_slide_count(path: str) -> Optional[int]:
+    with zipfile.ZipFile(path) as zf:
+        return sum(1 for name in zf.namelist() if _SLIDE_ENTRY.match(name)) or None
+
+
+def _read_exact(f, n: int) -> bytes:
+    data = f.read(n)
+    if len(data) != n:
+        raise ValueError("fichier tronqué")
+    return data
+
+
+def _iter_boxes(f, start: int, end: int):
+    """Boîtes ISO-BMFF (type, début du contenu, fin) entre start et end."""
+    pos = start
+    while pos + 8 <= end:
+        f.seek(pos)
+        size, kind = struct.unpack(">I4s", _read_exact(f, 8))
+        header = 8
+        if size == 1:
+            size = struct.unpack(">Q", _read_exact(f, 8))[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header:
+            return
+        yield kind, pos + header, pos + size
+        pos += size
+
+
+def mp4_duration_minutes(path: str) -> Optional[int]:
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        for kind, lo, hi in _iter_boxes(f, 0, size):
+            if kind != b"moov":
+                continue
+            for sub, slo, _ in _iter_boxes(f, lo, hi):
+                if sub != b"mvhd":
+                    continue
+                f.seek(slo)
+                version = _read_exact(f, 4)[0]
+                if version == 1:
+                    timescale, duration = struct.unpack(">16xIQ", _read_exact(f, 28))
+                else:
+                    timescale, duration = struct.unpack(">8xII", _read_exact(f, 16))
+                if timescale:
+                    return max(1, ceil(duration / timescale / 60))
+    return None
+
+
+READERS = {
+    ".pdf": ("page", pdf_page_count),
+    ".pptx": ("slide", pptx_slide_count),
+    ".mp4": ("video_min", mp4_duration_minutes),
+    ".m4v": ("video_min", mp4_duration_minutes),
+    ".mov": ("video_min", mp4_duration_minutes),
+}
+
+
+# =========================
+#   Scan du dossier
+# =========================
+
+def _cache_key(path: str, st: os.stat_result) -> str:
+    return f"{path}|{st.st_mtime_ns}|{st.st_size}"
+
+
+def _measure(path: str) -> Optional[Tuple[str, int]]:
+    unit_type, reader = READERS[Path(path).suffix.lower()]
+    try:
+        units = reader(path)
+    except Exception:
+        return None   # fichier illisible ou corrompu : non mesuré, sans interrompre le scan
+    return (unit_type, units) if units else None
+
+
+def _load_cache(cache_path: Path) -> Dict[str, Optional[list]]:
+    try:
+        with open(cache_path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(cache_path: Path, cache: Dict[str, Optional[list]]) -> None:
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = cache_path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(cache, f)
+    os.replace(tmp, cache_path)
+
+
+def scan_folder(folder: str, cache_path: Optional[Path] = DEFAULT_CACHE_PATH,
+                max_workers: Optional[int] = None) -> List[ScannedFile]:
+    """Mesure tous les fichiers reconnus du dossier (récursif), triés par chemin."""
+    files: List[Tuple[str, str]] = []  # (chemin, clé de cache)
+    for root, _, names in os.walk(folder):
+        for name in names:
+            if Path(name).suffix.lower() in READERS:
+                path = os.path.abspath(os.path.join(root, name))
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue   # lien symbolique cassé, fichier supprimé entre-temps...
+                files.append((path, _cache_key(path, st)))
+    files.sort()
+
+    cache = _load_cache(cache_path) if cache_path else {}
+    todo = [(path, key) for path, key in files if key not in cache]
+    if todo:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results = pool.map(_measure, [path for path, _ in todo])
+            for (_, key), result in zip(todo, results):
+                cache[key] = list(result) if result else None
+        if cache_path:
+            # Purger les anciennes versions des fichiers de ce dossier
+            prefix = os.path.join(os.path.abspath(folder), "")   # avec séparateur final : pas les dossiers voisins
+            live = {key for _, key in files}
+            _save_cache(cache_path, {k: v for k, v in cache.items() if k in live or not k.startswith(prefix)})
+
+    out: List[ScannedFile] = []
+    for path, key in files:
+        entry = cache.get(key)
+        if entry:
+            out.append(ScannedFile(path, entry[0], int(entry[1])))
+    return out
+
+
+def scan_content_blocks(folder: str, cache_path: Optional[Path] = DEFAULT_CACHE_PATH,
+                        max_workers: Optional[int] = None) -> List[ContentBlock]:
+    """Un ContentBlock (coefficients neutres) par fichier reconnu."""
+    return [ContentBlock(units=f.units, unit_type=f.unit_type)
+            for f in scan_folder(folder, cache_path, max_workers)]
@@ -0,0 +1,165 @@
+"""
+Export iCalendar (.ics) des plans d'étude
+---------------------------------------------------
+Les lignes sont produites par un générateur et écrites au fil de l'eau.
+Avec des séances horaires (PlanResult.sessions), un VEVENT par séance ;
+sinon un événement « journée entière » par jour travaillé.
+Le mode cohorte planifie et écrit un .ics par étudiant en parallèle,
+avec un nombre borné de tâches en vol.
+---------------------------------------------------
+"""
+from __future__ import annotations
+
+import datetime as dt
+import os
+import re
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, Set, Tuple
+
+from plan_cache import cached_build_study_plan
+from study_planner import KIND_LABELS, PlanResult
+
+PRODID = "-//Planificateur d'etude//FR"
+
+
+def _escape(text: str) -> str:
+    return (text.replace("\\", "\\\\").replace(";", "\\;")
+                .replace(",", "\\,").replace("\n", "\\n"))
+
+
+def _safe_name(ident: str) -> str:
+    return re.sub(r"[^\w.-]+", "_", ident) or "etudiant"
+
+
+def _fold(line: str) -> Iterator[str]:
+    """Plie les lignes à 75 octets (RFC 5545 §3.1)."""
+    data = line.encode("utf-8")
+    if len(data) <= 75:
+        yield line
+        return
+    start, first = 0, True
+    while start < len(data):
+        size = 75 if first else 74
+        end = min(len(data), start + size)
+        while end < len(data) and (data[end] & 0xC0) == 0x80:  # ne pas couper un caractère UTF-8
+            end -= 1
+        chunk = data[start:end].decode("utf-8")
+        yield chunk if first else " " + chunk
+        start, first = end, False
+
+
+def _event(uid: str, stamp: str, start: str, end: str, summary: str, description: str) -> Iterator[str]:
+    yield "BEGIN:VEVENT"
+    yield f"UID:{uid}"
+    yield f"DTSTAMP:{stamp}"
+    yield start
+    yield end
+    yield f"SUMMARY:{_escape(summary)}"
+    yield f"DESCRIPTION:{_escape(description)}"
+    yield "END:VEVENT"
+
+
+def iter_ics_lines(plan: PlanResult, uid_prefix: str = "plan", title: str = "Étude") -> Iterator[str]:
+    """
+    Lignes (sans CRLF) du calendrier correspondant au plan.
+    UID = uid_prefix + jour (+ rang de la séance) : avec un identifiant stable
+    (cours, étudiant), réimporter un plan régénéré met ses événements à jour, et
+    deux cours différents ne s'écrasent pas.
+    """
+    stamp = dt.datetime.now(dt.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    uid_prefix = _safe_name(uid_prefix)
+    header = ["BEGIN:VCALENDAR", "VERSION:2.0", f"PRODID:{PRODID}", "CALSCALE:GREGORIAN",
+              f"X-WR-CALNAME:{_escape(title)}"]
+    yield from header
+
+    if plan.sessions:
+        for i, ss in enumerate(plan.sessions):
+            if ss.date is None:
+                raise ValueError("Le plan n'a pas de dates : indiquer start_date.")
+            day = dt.datetime.fromisoformat(ss.date)
+            start = day + dt.timedelta(minutes=ss.start_min)
+            end = day + dt.timedelta(minutes=ss.end_min)
+            lines = _event(
+                f"{uid_prefix}-{ss.day_index}-{i}@planificateur",
+                stamp,
+                f"DTSTART:{start:%Y%m%dT%H%M%S}",
+                f"DTEND:{end:%Y%m%dT%H%M%S}",
+                f"{title} – {KIND_LABELS[ss.kind]}",
+                f"{ss.work_min} min de travail",
+            )
+            for line in lines:
+                yield from _fold(line)
+    else:
+        for it in plan.per_day:
+            total = it.learn_min + it.exercises_min + it.review_min + it.mock_min
+            if total == 0:
+                continue
+            if it.date is None:
+                raise ValueError("Le plan n'a pas de dates : indiquer start_date.")
+            day = dt.date.fromisoformat(it.date)
+            detail = (f"Apprentissage {it.learn_min} min\nExercices {it.exercises_min} min\n"
+                      f"Révision {it.review_min} min\nExamens blancs {it.mock_min} min")
+            lines = _event(
+                f"{uid_prefix}-{it.day_index}@planificateur",
+                stamp,
+                f"DTSTART;VALUE=DATE:{day:%Y%m%d}",
+                f"DTEND;VALUE=DATE:{day + dt.timedelta(days=1):%Y%m%d}",
+                f"{title} : {total} min",
+                detail,
+            )
+            for line in lines:
+                yield from _fold(line)
+
+    yield "END:VCALENDAR"
+
+
+def write_ics(plan: PlanResult, path: str, uid_prefix: str = "plan", title: str = "Étude") -> None:
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for line in iter_ics_lines(plan, uid_prefix, title):
+            f.write(line + "\r\n")
+
+
+# =========================
+#   Mode cohorte
+# =========================
+
+def _unique_name(student_id: str, used: Set[str]) -> str:
+    """Nom de fichier sûr, suffixé (-2, -3...) si un autre identifiant y mène déjà."""
+    base = _safe_name(student_id)
+    name, n = base, 1
+    while name.lower() in used:   # insensible à la casse (systèmes de fichiers Windows/macOS)
+        n += 1
+        name = f"{base}-{n}"
+    used.add(name.lower())
+    return name
+
+
+def _plan_and_write(name: str, plan_kwargs: Dict[str, Any], out_dir: str) -> str:
+    plan = cached_build_study_plan(**plan_kwargs)
+    path = str(Path(out_dir) / f"{name}.ics")
+    write_ics(plan, path, uid_prefix=name)
+    return path
+
+
+def export_cohort_ics(jobs: Iterable[Tuple[str, Dict[str, Any]]], out_dir: str,
+                      max_workers: Optional[int] = None) -> Iterator[str]:
+    """
+    jobs : (identifiant étudiant, arguments de build_study_plan), éventuellement paresseux.
+    Les plans déjà calculés (même cours, mêmes paramètres) sont relus dans le cache disque.
+    Renvoie les chemins écrits au fur et à mesure ; au plus 2 × max_workers plans en vol.
+    """
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+    workers = max_workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        limit = 2 * workers
+        pending = set()
+        used: Set[str] = set()
+        for student_id, kwargs in jobs:
+            pending.add(pool.submit(_plan_and_write, _unique_name(student_id, used), kwargs, out_dir))
+            if len(pending) >= limit:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    yield fut.result()
+        for fut in as_completed(pending):
+            yield fut.result()
@@ -0,0 +1,225 @@
+"""
+Cache disque des plans, adressé par contenu
+---------------------------------------------------
+Clé = sha256 des entrées de build_study_plan sous forme canonique (JSON trié),
+de ENGINE_VERSION, de la version du format binaire et du registre des types
+d'unités. Une mise à jour du moteur change donc toutes les clés : les anciennes
+entrées ne sont plus lues et finissent évincées.
+
+Les entrées (format plan_codec) sont écrites dans un fichier temporaire puis
+renommées (os.replace) : un lecteur voit l'ancien fichier, le nouveau ou rien.
+L'éviction LRU se base sur la date de modification, rafraîchie à chaque
+lecture ; plusieurs processus peuvent partager le dossier, un fichier supprimé
+par un autre processus est simplement traité comme absent.
+---------------------------------------------------
+"""
+from __future__ import annotations
+
+import datetime as dt
+import hashlib
+import json
+import os
+import tempfile
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import List, Optional, Union
+
+from plan_codec import VERSION as CODEC_VERSION, decode_plan, encode_plan
+from study_planner import (
+    ENGINE_VERSION, UNIT_TYPE_REGISTRY, Assessment, Coefficients, Constraints, ContentBlock,
+    DEFAULT_COEFFICIENTS, ExamProfile, PlanResult, UserProfile, build_study_plan,
+)
+
+CACHE_DIR_ENV = "PLANIFICATEUR_CACHE_DIR"
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "planificateur_etude" / "plans"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+EVICT_EVERY = 64          # nb d'écritures entre deux passes d'éviction
+STALE_TMP_SECONDS = 3600  # fichiers temporaires abandonnés (processus interrompu)
+
+_SUFFIX = ".plan"
+
+
+def _json_default(obj):
+    if isinstance(obj, (dt.date, dt.datetime)):
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj)
+    raise TypeError(f"Type non sérialisable dans la clé de cache: {type(obj).__name__}")
+
+
+def plan_key(
+    contents: List[ContentBlock],
+    exam: ExamProfile,
+    user: UserProfile,
+    constraints: Constraints,
+    start_date: Optional[dt.date] = None,
+    want_mocks: bool = True,
+    mock_duration_min: int = 90,
+    mock_review_ratio: float = 0.5,
+    coeffs: Optional[Coefficients] = None,
+    with_sessions: bool = False,
+    assessments: Optional[List[Assessment]] = None
+) -> str:
+    """Empreinte hexadécimale stable des entrées de build_study_plan."""
+    if start_date is None and constraints.calendar is not None:
+        start_date = dt.date.today()   # le calendrier est alors interprété à partir d'aujourd'hui
+    payload = {
+        "engine": ENGINE_VERSION,
+        "codec": CODEC_VERSION,
+        "units": {name: asdict(u) for name, u in UNIT_TYPE_REGISTRY.items()},
+        "contents": [asdict(b) for b in contents],
+        "exam": asdict(exam),
+        "user": asdict(user),
+        "constraints": asdict(constraints),
+        "start_date": start_date,
+        "want_mocks": want_mocks,
+        "mock_duration_min": mock_duration_min,
+        "mock_review_ratio": mock_review_ratio,
+        "coeffs": asdict(coeffs or DEFAULT_COEFFICIENTS),
+        "with_sessions": with_sessions,
+        "assessments": [asdict(a) for a in assessments] if assessments else None,
+    }
+    text = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=_json_default)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class PlanCache:
+    """Dossier de plans encodés, borné en taille (éviction des moins récemment utilisés)."""
+
+    def __init__(self, directory: Union[str, Path, None] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = Path(directory or os.environ.get(CACHE_DIR_ENV) or DEFAULT_CACHE_DIR)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / (key + _SUFFIX)
+
+    def get(self, key: str) -> Optional[PlanResult]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            # Absent, illisible ou dossier de cache inutilisable : comme put, on continue sans cache
+            self.misses += 1
+            return None
+        try:
+            plan = decode_plan(data)
+        except ValueError:
+            # Entrée corrompue (ou d'un format inconnu) : decode_plan lève ValueError, on l'écarte
+            self._unlink(path)
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)   # rafraîchit la position LRU
+        except OSError:
+            pass
+        self.hits += 1
+        return plan
+
+    def put(self, key: str, plan: PlanResult) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(encode_plan(plan))
+            os.replace(tmp, path)
+        except BaseException:
+            self._unlink(Path(tmp))
+            raise
+        if self._writes % EVICT_EVERY == 0:
+            self.evict()
+        self._writes += 1
+
+    def evict(self) -> int:
+        """Supprime les entrées les plus anciennes jusqu'à repasser sous max_bytes. Renvoie le nb supprimé."""
+        entries = []
+        total = 0
+        now = time.time()
+        if not self.directory.is_dir():
+            return 0
+        for sub in os.scandir(self.directory):
+            if not sub.is_dir():
+                continue
+            try:
+                children = list(os.scandir(sub.path))
+            except FileNotFoundError:
+                continue
+            for entry in children:
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if entry.name.endswith(".tmp"):
+                    if now - st.st_mtime > STALE_TMP_SECONDS:
+                        self._unlink(Path(entry.path))
+                    continue
+                if entry.name.endswith(_SUFFIX):
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+                    total += st.st_size
+        removed = 0
+        if total > self.max_bytes:
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                self._unlink(Path(path))
+                total -= size
+                removed += 1
+        return removed
+
+    def clear(self) -> None:
+        for path in self.directory.glob(f"*/*{_SUFFIX}"):
+            self._unlink(path)
+
+    @staticmethod
+    def _unlink(path: Path) -> None:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+_default_cache: Optional[PlanCache] = None
+
+
+def default_cache() -> PlanCache:
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = PlanCache()
+    return _default_cache
+
+
+def cached_build_study_plan(
+    contents: List[ContentBlock],
+    exam: ExamProfile,
+    user: UserProfile,
+    constraints: Constraints,
+    start_date: Optional[dt.date] = None,
+    want_mocks: bool = True,
+    mock_duration_min: int = 90,
+    mock_review_ratio: float = 0.5,
+    coeffs: Optional[Coefficients] = None,
+    with_sessions: bool = False,
+    assessments: Optional[List[Assessment]] = None,
+    cache: Optional[PlanCache] = None
+) -> PlanResult:
+    """build_study_plan, avec lecture/écriture dans le cache disque."""
+    cache = cache or default_cache()
+    inputs = dict(contents=contents, exam=exam, user=user, constraints=constraints,
+                  start_date=start_date, want_mocks=want_mocks, mock_duration_min=mock_duration_min,
+                  mock_review_ratio=mock_review_ratio, coeffs=coeffs, with_sessions=with_sessions,
+                  assessments=assessments)
+    key = plan_key(**inputs)
+    plan = cache.get(key)
+    if plan is None:
+        plan = build_study_plan(**inputs)
+        try:
+            cache.put(key, plan)
+        except OSError:
+            pass   # cache en lecture seule ou disque plein : le plan reste valide
+    return plan
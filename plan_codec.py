@@ -0,0 +1,316 @@
+"""
+Format binaire compact pour PlanResult
+---------------------------------------------------
+Disposition (version 2) :
+  "SPLN" | version u8 | drapeaux u8 (1 = dates, 2 = séances, 4 = jalons)
+  total_minutes, nb_jours, [ordinal de la date de début]        (varints)
+  breakdown, params_used                                         (clé + valeur)
+  table d'offsets u32 : un par (bloc de BLOCK_DAYS jours, colonne) + fin des jours
+  colonnes par bloc : 1re valeur puis deltas (varints zigzag)
+  [séances : écart de jour, type, début, durée, travail, dans la plage]
+  [jalons : nom, premier jour, jour de l'évaluation, minutes par catégorie]
+La version 1 (sans jalons) reste lisible.
+
+La table d'offsets permet à PlanView de lire un seul jour en ne décodant que
+son bloc (au plus BLOCK_DAYS valeurs par colonne), sans copier le tampon.
+---------------------------------------------------
+"""
+from __future__ import annotations
+
+import datetime as dt
+import struct
+from typing import Dict, List, Optional, Tuple
+
+from study_planner import MilestonePlan, PlanItem, PlanResult, StudySession
+
+MAGIC = b"SPLN"
+VERSION = 2
+READABLE_VERSIONS = (1, 2)
+BLOCK_DAYS = 64
+COLUMNS = ("learn_min", "exercises_min", "review_min", "mock_min")
+KINDS = ("learn", "exercises", "review", "mock")
+
+_FLAG_DATES = 1
+_FLAG_SESSIONS = 2
+_FLAG_MILESTONES = 4
+_TAG_INT = 0
+_TAG_FLOAT = 1
+
+# Erreurs de lecture d'un tampon tronqué ou altéré (converties en ValueError)
+_MALFORMED = (IndexError, KeyError, TypeError, OverflowError, UnicodeDecodeError, struct.error)
+
+
+# =========================
+#   Varints
+# =========================
+
+def _put_uvarint(out: bytearray, n: int) -> None:
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _put_svarint(out: bytearray, n: int) -> None:
+    _put_uvarint(out, n << 1 if n >= 0 else (-n << 1) - 1)
+
+
+def _get_uvarint(buf, pos: int) -> Tuple[int, int]:
+    n = shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        n |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return n, pos
+        shift += 7
+
+
+def _get_svarint(buf, pos: int) -> Tuple[int, int]:
+    n, pos = _get_uvarint(buf, pos)
+    return (n >> 1) ^ -(n & 1), pos
+
+
+def _put_str(out: bytearray, s: str) -> None:
+    data = s.encode("utf-8")
+    _put_uvarint(out, len(data))
+    out += data
+
+
+def _get_str(buf, pos: int) -> Tuple[str, int]:
+    n, pos = _get_uvarint(buf, pos)
+    return bytes(buf[pos:pos + n]).decode("utf-8"), pos + n
+
+
+# =========================
+#   Encodage
+# =========================
+
+def encode_plan(plan: PlanResult) -> bytes:
+    days = plan.per_day
+    start = dt.date.fromisoformat(days[0].date) if days and days[0].date else None
+    for i, it in enumerate(days):
+        expected = (start + dt.timedelta(days=i)).isoformat() if start else None
+        if it.day_index != i or it.date != expected:
+            raise ValueError("Les jours du plan doivent être contigus à partir de l'indice 0.")
+
+    flags = ((_FLAG_DATES if start else 0) | (_FLAG_SESSIONS if plan.sessions is not None else 0)
+             | (_FLAG_MILESTONES if plan.milestones is not None else 0))
+    out = bytearray(MAGIC)
+    out += bytes([VERSION, flags])
+    _put_svarint(out, plan.total_minutes)
+    _put_uvarint(out, len(days))
+    if start:
+        _put_uvarint(out, start.toordinal())
+
+    _put_uvarint(out, len(plan.breakdown))
+    for k, v in plan.breakdown.items():
+        _put_str(out, k)
+        _put_svarint(out, v)
+    _put_uvarint(out, len(plan.params_used))
+    for k, v in plan.params_used.items():
+        _put_str(out, k)
+        if isinstance(v, int) and not isinstance(v, bool):
+            out.append(_TAG_INT)
+            _put_svarint(out, v)
+        else:
+            out.append(_TAG_FLOAT)
+            out += struct.pack("<d", v)
+
+    # Colonnes par blocs, précédées de leur table d'offsets (relatifs au début des données)
+    n_blocks = (len(days) + BLOCK_DAYS - 1) // BLOCK_DAYS
+    data = bytearray()
+    offsets: List[int] = []
+    for b in range(n_blocks):
+        chunk = days[b * BLOCK_DAYS:(b + 1) * BLOCK_DAYS]
+        for col in COLUMNS:
+            offsets.append(len(data))
+            prev = 0
+            for it in chunk:
+                value = getattr(it, col)
+                _put_svarint(data, value - prev)
+                prev = value
+    offsets.append(len(data))
+    out += struct.pack(f"<{len(offsets)}I", *offsets)
+    out += data
+
+    if plan.sessions is not None:
+        _put_uvarint(out, len(plan.sessions))
+        prev_day = 0
+        for ss in plan.sessions:
+            _put_svarint(out, ss.day_index - prev_day)
+            prev_day = ss.day_index
+            out.append(KINDS.index(ss.kind))
+            _put_uvarint(out, ss.start_min)
+            _put_uvarint(out, ss.end_min - ss.start_min)
+            _put_uvarint(out, ss.work_min)
+            out.append(1 if ss.in_window else 0)
+
+    if plan.milestones is not None:
+        _put_uvarint(out, len(plan.milestones))
+        for m in plan.milestones:
+            _put_str(out, m.name)
+            _put_uvarint(out, m.first_day)
+            _put_uvarint(out, m.day_index)
+            for value in (m.learn, m.exercises, m.review, m.mock):
+                _put_svarint(out, value)
+    return bytes(out)
+
+
+# =========================
+#   Lecture
+# =========================
+
+class PlanView:
+    """
+    Lecture paresseuse d'un plan encodé (memoryview, pas de copie).
+    Un tampon tronqué ou altéré lève ValueError.
+    """
+
+    def __init__(self, buf):
+        self._buf = memoryview(buf)
+        try:
+            self._read_header()
+        except _MALFORMED as e:
+            raise ValueError(f"Plan encodé invalide: {e}") from e
+        if self._sessions_pos > len(self._buf):
+            raise ValueError("Plan encodé invalide: tampon tronqué")
+
+    def _read_header(self) -> None:
+        if bytes(self._buf[:4]) != MAGIC:
+            raise ValueError("Format de plan inconnu.")
+        if self._buf[4] not in READABLE_VERSIONS:
+            raise ValueError(f"Version de plan non prise en charge: {self._buf[4]}")
+        flags = self._buf[5]
+        pos = 6
+        self.total_minutes, pos = _get_svarint(self._buf, pos)
+        self.n_days, pos = _get_uvarint(self._buf, pos)
+        self.start_date: Optional[dt.date] = None
+        if flags & _FLAG_DATES:
+            ordinal, pos = _get_uvarint(self._buf, pos)
+            self.start_date = dt.date.fromordinal(ordinal)
+        self.has_sessions = bool(flags & _FLAG_SESSIONS)
+        self.has_milestones = bool(flags & _FLAG_MILESTONES)
+
+        self.breakdown: Dict[str, int] = {}
+        n, pos = _get_uvarint(self._buf, pos)
+        for _ in range(n):
+            k, pos = _get_str(self._buf, pos)
+            self.breakdown[k], pos = _get_svarint(self._buf, pos)
+        self.params_used: Dict[str, float] = {}
+        n, pos = _get_uvarint(self._buf, pos)
+        for _ in range(n):
+            k, pos = _get_str(self._buf, pos)
+            tag = self._buf[pos]
+            pos += 1
+            if tag == _TAG_INT:
+                self.params_used[k], pos = _get_svarint(self._buf, pos)
+            else:
+                self.params_used[k] = struct.unpack_from("<d", self._buf, pos)[0]
+                pos += 8
+
+        n_offsets = ((self.n_days + BLOCK_DAYS - 1) // BLOCK_DAYS) * len(COLUMNS) + 1
+        self._offsets_pos = pos
+        self._n_offsets = n_offsets
+        self._data = pos + 4 * n_offsets
+        self._sessions_pos = self._data + self._offset(n_offsets - 1)
+
+    def __len__(self) -> int:
+        return self.n_days
+
+    def _date(self, i: int) -> Optional[str]:
+        return (self.start_date + dt.timedelta(days=i)).isoformat() if self.start_date else None
+
+    def _offset(self, i: int) -> int:
+        # table stockée en petit-boutiste, quel que soit l'hôte
+        return struct.unpack_from("<I", self._buf, self._offsets_pos + 4 * i)[0]
+
+    def _column_block(self, b: int, c: int, upto: int) -> int:
+        """Valeur du jour `upto` (relatif au bloc b) dans la colonne c."""
+        pos = self._data + self._offset(b * len(COLUMNS) + c)
+        value = 0
+        for _ in range(upto + 1):
+            delta, pos = _get_svarint(self._buf, pos)
+            value += delta
+        return value
+
+    def day(self, i: int) -> PlanItem:
+        if not 0 <= i < self.n_days:
+            raise IndexError(i)
+        b, r = divmod(i, BLOCK_DAYS)
+        values = [self._column_block(b, c, r) for c in range(len(COLUMNS))]
+        return PlanItem(i, self._date(i), *values)
+
+    def days(self) -> List[PlanItem]:
+        items: List[PlanItem] = []
+        for b in range(0, self.n_days, BLOCK_DAYS):
+            size = min(BLOCK_DAYS, self.n_days - b)
+            cols = []
+            for c in range(len(COLUMNS)):
+                pos = self._data + self._offset((b // BLOCK_DAYS) * len(COLUMNS) + c)
+                value, values = 0, []
+                for _ in range(size):
+                    delta, pos = _get_svarint(self._buf, pos)
+                    value += delta
+                    values.append(value)
+                cols.append(values)
+            for r in range(size):
+                items.append(PlanItem(b + r, self._date(b + r), *(col[r] for col in cols)))
+        return items
+
+    def _read_sessions(self) -> Tuple[Optional[List[StudySession]], int]:
+        """Séances et position de la section suivante."""
+        pos = self._sessions_pos
+        if not self.has_sessions:
+            return None, pos
+        n, pos = _get_uvarint(self._buf, pos)
+        out: List[StudySession] = []
+        day = 0
+        for _ in range(n):
+            delta, pos = _get_svarint(self._buf, pos)
+            day += delta
+            kind = KINDS[self._buf[pos]]
+            start, pos = _get_uvarint(self._buf, pos + 1)
+            length, pos = _get_uvarint(self._buf, pos)
+            work, pos = _get_uvarint(self._buf, pos)
+            in_window = bool(self._buf[pos])
+            pos += 1
+            out.append(StudySession(day, self._date(day), kind, start, start + length, work, in_window))
+        return out, pos
+
+    def sessions(self) -> Optional[List[StudySession]]:
+        return self._read_sessions()[0]
+
+    def milestones(self) -> Optional[List[MilestonePlan]]:
+        if not self.has_milestones:
+            return None
+        pos = self._read_sessions()[1]
+        n, pos = _get_uvarint(self._buf, pos)
+        out: List[MilestonePlan] = []
+        for _ in range(n):
+            name, pos = _get_str(self._buf, pos)
+            first, pos = _get_uvarint(self._buf, pos)
+            last, pos = _get_uvarint(self._buf, pos)
+            values = []
+            for _ in range(4):
+                value, pos = _get_svarint(self._buf, pos)
+                values.append(value)
+            out.append(MilestonePlan(name, first, last, *values))
+        return out
+
+    def to_plan(self) -> PlanResult:
+        return PlanResult(
+            total_minutes=self.total_minutes,
+            per_day=self.days(),
+            breakdown=dict(self.breakdown),
+            params_used=dict(self.params_used),
+            sessions=self.sessions(),
+            milestones=self.milestones(),
+        )
+
+
+def decode_plan(buf) -> PlanResult:
+    try:
+        return PlanView(buf).to_plan()
+    except _MALFORMED as e:
+        raise ValueError(f"Plan encodé invalide: {e}") from e
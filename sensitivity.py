@@ -0,0 +1,184 @@
+"""
+Analyse de sensibilité de la charge d'étude
+---------------------------------------------------
+Dérivées partielles et élasticités de total_minutes et de chaque catégorie
+(learn, exercises, review, mock) par rapport à tous les paramètres d'entrée,
+calculées en une seule évaluation du modèle par différentiation automatique
+en mode direct (nombres duaux à gradient creux).
+
+Les arrondis, planchers et paliers du moteur sont traités comme la fonction
+lisse sous-jacente : les paramètres qui n'agissent que par paliers
+(days_available, plafonds journaliers...) ont une dérivée nulle.
+---------------------------------------------------
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, fields, replace
+from typing import Dict, List, Optional
+
+from study_planner import (
+    Coefficients, Constraints, ContentBlock, DEFAULT_COEFFICIENTS, ExamProfile, UserProfile,
+    exercise_count_raw, gap_adjustment_factors, initial_learning_raw, mock_count, review_fraction,
+)
+
+CATEGORIES = ["total", "learn", "exercises", "review", "mock"]
+
+
+class Dual:
+    """Valeur + gradient creux {paramètre: dérivée}."""
+    __slots__ = ("val", "grad")
+
+    def __init__(self, val: float, grad: Optional[Dict[str, float]] = None):
+        self.val = float(val)
+        self.grad = grad if grad is not None else {}
+
+    @staticmethod
+    def _parts(x):
+        return (x.val, x.grad) if isinstance(x, Dual) else (float(x), {})
+
+    def _combine(self, other, da: float, db: float, val: float) -> "Dual":
+        ov, og = self._parts(other)
+        grad = {k: da * v for k, v in self.grad.items()} if da else {}
+        if db:
+            for k, v in og.items():
+                grad[k] = grad.get(k, 0.0) + db * v
+        return Dual(val, grad)
+
+    def __add__(self, other):
+        return self._combine(other, 1.0, 1.0, self.val + self._parts(other)[0])
+    __radd__ = __add__
+
+    def __iadd__(self, other):
+        # Accumulation en place (sommes sur de longues listes de blocs)
+        ov, og = self._parts(other)
+        self.val += ov
+        for k, v in og.items():
+            self.grad[k] = self.grad.get(k, 0.0) + v
+        return self
+
+    def __sub__(self, other):
+        return self._combine(other, 1.0, -1.0, self.val - self._parts(other)[0])
+
+    def __rsub__(self, other):
+        return Dual(other) - self
+
+    def __neg__(self):
+        return Dual(-self.val, {k: -v for k, v in self.grad.items()})
+
+    def __mul__(self, other):
+        ov = self._parts(other)[0]
+        return self._combine(other, ov, self.val, self.val * ov)
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        ov = self._parts(other)[0]
+        return self._combine(other, 1.0 / ov, -self.val / (ov * ov), self.val / ov)
+
+    def __rtruediv__(self, other):
+        return Dual(other) / self
+
+    def __float__(self):
+        return self.val
+
+    def __lt__(self, other):
+        return self.val < self._parts(other)[0]
+
+    def __le__(self, other):
+        return self.val <= self._parts(other)[0]
+
+    def __gt__(self, other):
+        return self.val > self._parts(other)[0]
+
+    def __ge__(self, other):
+        return self.val >= self._parts(other)[0]
+
+    def __repr__(self):
+        return f"Dual({self.val}, {self.grad})"
+
+
+@dataclass
+class SensitivityEntry:
+    param: str                       # ex: "contents[2].difficulty", "user.notes_factor"
+    value: float
+    derivative: Dict[str, float]     # ∂catégorie/∂param (minutes par unité du paramètre)
+    elasticity: Dict[str, float]     # (∂f/f) / (∂x/x) : effet relatif d'une variation de 1%
+
+
+def _seed(obj, prefix: str, skip=()) -> object:
+    """Copie du dataclass où chaque champ numérique devient un Dual indépendant."""
+    changes = {}
+    for f in fields(obj):
+        value = getattr(obj, f.name)
+        if f.name in skip:
+            continue
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            key = f"{prefix}.{f.name}"
+            changes[f.name] = Dual(value, {key: 1.0})
+        elif isinstance(value, dict):
+            changes[f.name] = {k: Dual(v, {f"{prefix}.{f.name}[{k}]": 1.0}) for k, v in value.items()}
+    return replace(obj, **changes)
+
+
+def _val(x) -> float:
+    return x.val if isinstance(x, Dual) else float(x)
+
+
+def _grad(x) -> Dict[str, float]:
+    return x.grad if isinstance(x, Dual) else {}
+
+
+def sensitivity_report(
+    contents: List[ContentBlock],
+    exam: ExamProfile,
+    user: UserProfile,
+    constraints: Constraints,
+    want_mocks: bool = True,
+    mock_duration_min: int = 90,
+    mock_review_ratio: float = 0.5,
+    coeffs: Optional[Coefficients] = None,
+) -> List[SensitivityEntry]:
+    """Entrées triées par |élasticité| décroissante sur total_minutes."""
+    coeffs = coeffs or DEFAULT_COEFFICIENTS
+    d_contents = [_seed(b, f"contents[{i}]") for i, b in enumerate(contents)]
+    d_exam = _seed(exam, "exam")
+    d_user = _seed(user, "user", skip=("availability_windows",))
+    d_dur = Dual(mock_duration_min, {"mock_duration_min": 1.0})
+    d_ratio = Dual(mock_review_ratio, {"mock_review_ratio": 1.0})
+    days = constraints.days_available
+
+    # Même enchaînement que build_study_plan, sans arrondis
+    learn = initial_learning_raw(d_contents, d_user, coeffs)
+    exos = exercise_count_raw(d_contents, d_exam, d_user, coeffs)
+    exos = max(exos, d_user.problem_set_size * 0.6)
+    exercises = exos * d_user.exercise_min_each
+    review = max(30.0, learn * review_fraction(d_user, days, coeffs))
+    mock = mock_count(days) * (d_dur + d_dur * d_ratio) if want_mocks else 0.0
+    f_exo, f_review = gap_adjustment_factors(d_user)
+    exercises = exercises * f_exo
+    review = review * f_review
+    outputs = {"learn": learn, "exercises": exercises, "review": review, "mock": mock}
+    outputs["total"] = learn + exercises + review + mock
+
+    # Liste des paramètres (y compris ceux à dérivée nulle)
+    values: Dict[str, float] = {}
+    for seeded in [*d_contents, d_exam, d_user]:
+        for f in fields(seeded):
+            v = getattr(seeded, f.name)
+            if isinstance(v, Dual):
+                values.update({k: v.val for k in v.grad})
+            elif isinstance(v, dict):
+                values.update({k: d.val for d in v.values() if isinstance(d, Dual) for k in d.grad})
+    values["mock_duration_min"] = mock_duration_min
+    values["mock_review_ratio"] = mock_review_ratio
+    for f in fields(constraints):
+        v = getattr(constraints, f.name)
+        if isinstance(v, (int, float)):
+            values[f"constraints.{f.name}"] = v
+
+    entries: List[SensitivityEntry] = []
+    for param, x in values.items():
+        deriv = {c: _grad(outputs[c]).get(param, 0.0) for c in CATEGORIES}
+        elast = {c: (deriv[c] * x / _val(outputs[c])) if _val(outputs[c]) else 0.0 for c in CATEGORIES}
+        entries.append(SensitivityEntry(param, float(x), deriv, elast))
+    entries.sort(key=lambda e: abs(e.elasticity["total"]), reverse=True)
+    return entries
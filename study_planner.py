@@ -1,8 +1,11 @@
 from __future__ import annotations
+from copy import deepcopy
 from dataclasses import dataclass, asdict
-from math import ceil
-from typing import List, Dict, Optional
+from math import ceil, floor
+from bisect import bisect_left, bisect_right
+from typing import List, Dict, Optional, Tuple
 import datetime as dt
+import json
 
 # =========================
 #   Structures de données
@@ -44,6 +47,50 @@ class UserProfile:
     fatigue_penalty: float = 1.2          # coût marginal après seuil (20% de temps en plus)
     target_grade: float = 0.8             # 0.5-1.0 (objectif 80% par défaut)
     current_mastery: float = 0.5          # 0-1 (auto-évaluation globale)
+    availability_windows: List[Tuple[int, int]] = None  # plages dispo (minutes depuis minuit)
+    session_length_min: int = 50          # durée d'une séance avant pause
+    break_min: int = 10                   # pause entre deux séances
+
+    def __post_init__(self):
+        if self.availability_windows is None:
+            self.availability_windows = [(9*60, 12*60), (14*60, 18*60), (19*60, 21*60)]
+
+@dataclass
+class StudyCalendar:
+    """Jours indisponibles récurrents, interprétés à partir de start_date."""
+    blocked_weekdays: List[int] = None                    # 0=lundi ... 6=dimanche (ex: [6] = tous les dimanches)
+    blocked_ranges: List[Tuple[dt.date, dt.date]] = None  # intervalles inclusifs (vacances, stages...)
+    holidays: List[dt.date] = None                        # jours isolés (fériés)
+
+    def __post_init__(self):
+        if self.blocked_weekdays is None:
+            self.blocked_weekdays = []
+        invalid = [wd for wd in self.blocked_weekdays if not 0 <= wd <= 6]
+        if invalid:
+            raise ValueError(f"jour de la semaine invalide (0=lundi .. 6=dimanche): {invalid}")
+        if self.blocked_ranges is None:
+            self.blocked_ranges = []
+        if self.holidays is None:
+            self.holidays = []
+
+    def compile(self, start_date: dt.date, days: int) -> bytearray:
+        """Masque jour par jour (1 = bloqué) sur l'horizon [start_date, start_date + days)."""
+        mask = bytearray(days)
+        if self.blocked_weekdays:
+            week = bytearray(7)
+            for wd in self.blocked_weekdays:
+                week[(wd - start_date.weekday()) % 7] = 1
+            mask[:] = (week * (days // 7 + 1))[:days]
+        for lo, hi in self.blocked_ranges:
+            a = max(0, (lo - start_date).days)
+            b = min(days, (hi - start_date).days + 1)
+            if a < b:
+                mask[a:b] = b"\x01" * (b - a)
+        for day in self.holidays:
+            i = (day - start_date).days
+            if 0 <= i < days:
+                mask[i] = 1
+        return mask
 
 @dataclass
 class Constraints:
@@ -51,6 +98,7 @@ class Constraints:
     max_minutes_per_day: int = 240        # plafond raisonnable/jour
     min_minutes_per_day: int = 60
     blocked_days: Optional[List[int]] = None  # indices de jours (0..D-1) indisponibles
+    calendar: Optional[StudyCalendar] = None  # règles récurrentes (jours de semaine, congés, fériés)
 
 @dataclass
 class PlanItem:
@@ -61,112 +109,267 @@ class PlanItem:
     review_min: int
     mock_min: int
 
+@dataclass
+class StudySession:
+    day_index: int
+    date: Optional[str]
+    kind: str                  # 'learn' | 'exercises' | 'review' | 'mock'
+    start_min: int             # minutes depuis minuit
+    end_min: int
+    work_min: int              # minutes de travail (hors surcoût de fatigue)
+    in_window: bool = True     # False si la journée déborde des plages disponibles
+
+@dataclass
+class Assessment:
+    """Évaluation datée du cours (quiz, partiel, final) portant sur une partie du contenu."""
+    name: str
+    day_index: int                            # jour de l'évaluation (0..D-1)
+    exam: ExamProfile
+    block_indices: Optional[List[int]] = None  # indices dans contents (None = tout le contenu)
+    want_mocks: bool = True
+
+@dataclass
+class MilestonePlan:
+    """Minutes planifiées dans la fenêtre [first_day, day_index] qui précède une évaluation."""
+    name: str
+    first_day: int
+    day_index: int
+    learn: int
+    exercises: int
+    review: int
+    mock: int
+
 @dataclass
 class PlanResult:
     total_minutes: int
     per_day: List[PlanItem]
     breakdown: Dict[str, int]  # {"learn":..., "exercises":..., "review":..., "mock":...}
     params_used: Dict[str, float]
+    sessions: Optional[List[StudySession]] = None  # séances horaires (si demandées)
+    milestones: Optional[List[MilestonePlan]] = None  # une fenêtre par évaluation (si assessments)
+
+KIND_LABELS = {"learn": "Apprentissage", "exercises": "Exercices", "review": "Révision", "mock": "Examen blanc"}
+
+# À incrémenter à chaque changement du calcul : invalide les plans mis en cache (plan_cache.py)
+ENGINE_VERSION = 2
 
 # =========================
 #   Coefficients unitaires
 # =========================
 
-UNIT_BASE_MIN = {
-    "page": 2.5,        # min/page de base (sans coeffs)
-    "slide": 1.0,       # min/slide de base (sans coeffs)
-    "video_min": 1.0,   # 1 minute de vidéo = 1 minute de temps base
-    "exo": 7.0,
-}
+@dataclass
+class UnitType:
+    """Type d'unité : coût de base et champ de UserProfile qui le module."""
+    name: str
+    base_min: float                   # min/unité de base (sans coeffs)
+    user_field: Optional[str] = None  # champ UserProfile (vitesse perso) qui remplace la vitesse de base
+    user_reference: float = 1.0       # valeur de ce champ qui correspond à base_min
+
+UNIT_TYPE_REGISTRY: Dict[str, UnitType] = {}
+UNIT_BASE_MIN: Dict[str, float] = {}
+
+
+def register_unit_type(name: str, base_min: float,
+                       user_field: Optional[str] = None, user_reference: float = 1.0) -> UnitType:
+    """Ajoute (ou remplace) un type d'unité utilisable dans les ContentBlock."""
+    if user_field is not None and user_field not in UserProfile.__dataclass_fields__:
+        raise ValueError(f"champ UserProfile inconnu: {user_field}")
+    unit = UnitType(name, base_min, user_field, user_reference)
+    UNIT_TYPE_REGISTRY[name] = unit
+    UNIT_BASE_MIN[name] = base_min
+    return unit
+
+
+register_unit_type("page", 2.5, "read_speed_page_min", 2.5)      # min/page de base
+register_unit_type("slide", 1.0, "read_speed_slide_min", 1.0)    # min/slide de base
+register_unit_type("video_min", 1.0, "video_multiplier", 1.0)    # 1 minute de vidéo = 1 minute de temps base
+register_unit_type("exo", 7.0, "exercise_min_each", 7.0)
+register_unit_type("lab_hour", 60.0)                             # heure de laboratoire (présentiel)
+register_unit_type("podcast_min", 1.0, "video_multiplier", 1.0)  # même vitesse de lecture que les vidéos
+register_unit_type("flashcard", 0.5)                             # une carte mémoire (recto/verso)
+
+@dataclass
+class Coefficients:
+    """Constantes du moteur (réglage manuel par défaut, ou calibrées via calibration.py)."""
+    unit_base_min: Dict[str, float] = None          # min/unité calibrées par type (sinon : registre des types)
+    question_mix_weights: Dict[str, float] = None   # poids de chaque type de question sur le volume d'exos
+    weight_problems_base: float = 0.7               # weight_factor = base + slope * weight_problems
+    weight_problems_slope: float = 0.6
+    gap_slope: float = 0.7                          # gap_factor = 1 + slope * gap
+    review_fractions: List[float] = None            # part de révision par horizon (<=2, <=5, <=10, >10 jours)
+
+    def __post_init__(self):
+        if self.unit_base_min is None:
+            self.unit_base_min = {}
+        if self.question_mix_weights is None:
+            self.question_mix_weights = {"problèmes": 1.0, "rédaction": 0.6, "QCM": 0.3}
+        if self.review_fractions is None:
+            self.review_fractions = [0.20, 0.28, 0.33, 0.38]
+
+DEFAULT_COEFFICIENTS = Coefficients()
+
+
+def load_coefficients(path: str) -> Coefficients:
+    """Charge un jeu de coefficients (JSON) ; les clés absentes gardent leur valeur par défaut."""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    # Les types absents de unit_base_min gardent la valeur du registre (register_unit_type)
+    return Coefficients(**{k: v for k, v in data.items() if k in Coefficients.__dataclass_fields__})
+
+
+def save_coefficients(coeffs: Coefficients, path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(asdict(coeffs), f, ensure_ascii=False, indent=2)
+
+# =========================
+#   Arrondis
+# =========================
+
+def _apportion(total: int, weights: List[float]) -> List[int]:
+    """
+    Méthode du plus fort reste : entiers proportionnels à `weights` dont la somme
+    vaut exactement `total` (poids tous nuls = parts égales). O(n log n).
+    """
+    n = len(weights)
+    if n == 0:
+        return []
+    wsum = sum(weights)
+    if wsum <= 0:
+        weights, wsum = [1.0] * n, float(n)
+    quotas = [total * w / wsum for w in weights]
+    shares = [floor(q) for q in quotas]
+    left = total - sum(shares)
+    # plus grands restes d'abord ; à égalité, les premiers indices
+    for i in sorted(range(n), key=lambda i: shares[i] - quotas[i])[:left]:
+        shares[i] += 1
+    return shares
+
 
 # =========================
 #   Calcul des composantes
 # =========================
 
-def estimate_initial_learning_minutes(blocks: List[ContentBlock], user: UserProfile) -> int:
-    total = 0.0
+def unit_multiplier_table(user: UserProfile, coeffs: Coefficients = DEFAULT_COEFFICIENTS) -> Dict[str, float]:
+    """Minutes par unité « neutre » pour chaque type, pour cet utilisateur."""
+    common = user.notes_factor * user.language_penalty
+    table = {}
+    for name, unit in UNIT_TYPE_REGISTRY.items():
+        rate = coeffs.unit_base_min.get(name, unit.base_min)   # valeur calibrée, sinon celle du registre
+        # Adapter aux vitesses personnelles
+        if unit.user_field is not None:
+            rate *= getattr(user, unit.user_field) / unit.user_reference
+        table[name] = rate * common
+    return table
+
+
+# Les fonctions *_raw / *_fraction / *_factors restent en flottants (sans arrondi) :
+# elles servent aussi au calcul de sensibilité (sensitivity.py).
+
+def content_quantities(blocks: List[ContentBlock]) -> Dict[str, float]:
+    """Agrégat par type : Σ unités × densité × difficulté × nouveauté."""
+    per_type: Dict[str, float] = {}
     for b in blocks:
-        if b.unit_type not in UNIT_BASE_MIN:
-            raise ValueError(f"unit_type inconnu: {b.unit_type}")
+        quantity = b.units * b.density * b.difficulty * b.novelty
+        if b.unit_type in per_type:
+            per_type[b.unit_type] += quantity
+        else:
+            per_type[b.unit_type] = quantity
+    return per_type
 
-        base = UNIT_BASE_MIN[b.unit_type] * b.units
 
-        # Adapter aux vitesses personnelles
-        if b.unit_type == "page":
-            base *= (user.read_speed_page_min / UNIT_BASE_MIN["page"])
-        elif b.unit_type == "slide":
-            base *= (user.read_speed_slide_min / UNIT_BASE_MIN["slide"])
-        elif b.unit_type == "video_min":
-            base *= user.video_multiplier
-        elif b.unit_type == "exo":
-            base *= (user.exercise_min_each / UNIT_BASE_MIN["exo"])
+def learning_from_quantities(per_type: Dict[str, float], table: Dict[str, float]) -> float:
+    # Un seul produit par type
+    total = 0.0
+    for unit_type, quantity in per_type.items():
+        if unit_type not in table:
+            raise ValueError(f"unit_type inconnu: {unit_type}")
+        total += quantity * table[unit_type]
+    return total
 
-        # Densité, difficulté, nouveauté, prise de notes, langue
-        base *= b.density * b.difficulty * b.novelty
-        base *= user.notes_factor * user.language_penalty
 
-        total += base
+def initial_learning_raw(blocks: List[ContentBlock], user: UserProfile,
+                         coeffs: Coefficients = DEFAULT_COEFFICIENTS) -> float:
+    return learning_from_quantities(content_quantities(blocks), unit_multiplier_table(user, coeffs))
 
-    return int(round(total))
 
+def estimate_initial_learning_minutes(blocks: List[ContentBlock], user: UserProfile,
+                                      coeffs: Coefficients = DEFAULT_COEFFICIENTS) -> int:
+    return int(round(initial_learning_raw(blocks, user, coeffs)))
 
-def estimate_exercise_minutes(blocks: List[ContentBlock], exam: ExamProfile, user: UserProfile) -> int:
-    """
-    Dimensionne un volume d'exos significatifs en fonction du mix de questions
-    et du poids 'problems' dans l'évaluation.
-    """
+
+def exercise_count_raw(blocks: List[ContentBlock], exam: ExamProfile, user: UserProfile,
+                       coeffs: Coefficients = DEFAULT_COEFFICIENTS) -> float:
+    """Nombre d'exercices visé, avant arrondi et garde-fou."""
     # Taille cible d’un « set » d’exercices représentatifs
     target_set = user.problem_set_size
 
     # Plus le mix favorise problèmes/rédaction, plus on pousse d'exos
-    mix_factor = (exam.question_mix.get("problèmes", 0) * 1.0 +
-                  exam.question_mix.get("rédaction", 0) * 0.6 +
-                  exam.question_mix.get("QCM", 0) * 0.3)
+    mix_factor = sum(exam.question_mix.get(q, 0) * w for q, w in coeffs.question_mix_weights.items())
 
     # Influence du poids problems dans la note
-    weight_factor = 0.7 + 0.6 * exam.weight_problems  # 0.7..1.3
+    weight_factor = coeffs.weight_problems_base + coeffs.weight_problems_slope * exam.weight_problems  # 0.7..1.3
 
     # Ajustement selon l’écart entre objectif et maîtrise actuelle
     gap = max(0.0, user.target_grade - user.current_mastery)   # 0..1
-    gap_factor = 1.0 + 0.7 * gap                                # jusqu’à +70%
+    gap_factor = 1.0 + coeffs.gap_slope * gap                   # jusqu’à +70%
 
     # Un bloc "exo" explicite dans le contenu augmente encore le quota
     explicit_exo_units = sum(b.units for b in blocks if b.unit_type == "exo")
     explicit_exo_bonus = 1.0 + min(0.5, explicit_exo_units / max(1, target_set) * 0.3)
 
-    total_exos = int(round(target_set * mix_factor * weight_factor * gap_factor * explicit_exo_bonus))
-    total_exos = max(total_exos, int(round(target_set * 0.6)))  # garde-fou
+    return target_set * mix_factor * weight_factor * gap_factor * explicit_exo_bonus
+
+
+def estimate_exercise_minutes(blocks: List[ContentBlock], exam: ExamProfile, user: UserProfile,
+                              coeffs: Coefficients = DEFAULT_COEFFICIENTS) -> int:
+    """
+    Dimensionne un volume d'exos significatifs en fonction du mix de questions
+    et du poids 'problems' dans l'évaluation.
+    """
+    total_exos = int(round(exercise_count_raw(blocks, exam, user, coeffs)))
+    total_exos = max(total_exos, int(round(user.problem_set_size * 0.6)))  # garde-fou
 
     minutes = int(round(total_exos * user.exercise_min_each))
     return minutes
 
 
-def estimate_review_minutes(initial_minutes: int, user: UserProfile, days_available: int) -> int:
-    """
-    Courbe de l'oubli simplifiée via 3 à 4 vagues de révision.
-    Plus il y a de jours, plus on espace et on réalloue du temps à la révision.
-    """
+def review_fraction(user: UserProfile, days_available: int,
+                    coeffs: Coefficients = DEFAULT_COEFFICIENTS) -> float:
+    """Part du temps d'apprentissage à réallouer en révision."""
     # Part de révision basée sur sensibilité à l’oubli et horizon
     #  Jours courts: moins de vagues; Jours longs: plus de vagues
     if days_available <= 2:
-        waves = 1
-        frac = 0.20
+        frac = coeffs.review_fractions[0]    # 1 vague
     elif days_available <= 5:
-        waves = 2
-        frac = 0.28
+        frac = coeffs.review_fractions[1]    # 2 vagues
     elif days_available <= 10:
-        waves = 3
-        frac = 0.33
+        frac = coeffs.review_fractions[2]    # 3 vagues
     else:
-        waves = 4
-        frac = 0.38
+        frac = coeffs.review_fractions[3]    # 4 vagues
+
+    return frac * user.retention_sensitivity  # 0.5-0.8 par défaut
 
-    frac *= user.retention_sensitivity  # 0.5-0.8 par défaut
 
-    review_total = int(round(initial_minutes * frac))
+def estimate_review_minutes(initial_minutes: int, user: UserProfile, days_available: int,
+                            coeffs: Coefficients = DEFAULT_COEFFICIENTS) -> int:
+    """
+    Courbe de l'oubli simplifiée via 3 à 4 vagues de révision.
+    Plus il y a de jours, plus on espace et on réalloue du temps à la révision.
+    """
+    review_total = int(round(initial_minutes * review_fraction(user, days_available, coeffs)))
     return max(30, review_total)  # un minimum symbolique
 
 
+def mock_count(days_available: int) -> int:
+    """Examens blancs: 1 si fenêtre courte, 2 au-delà."""
+    if days_available <= 4:
+        return 1
+    elif days_available <= 10:
+        return 2
+    else:
+        return 2
+
+
 def estimate_mock_minutes(days_available: int,
                           want_mocks: bool = True,
                           mock_duration_min: int = 90,
@@ -177,19 +380,63 @@ def estimate_mock_minutes(days_available: int,
     """
     if not want_mocks:
         return 0
-    if days_available <= 4:
-        n = 1
-    elif days_available <= 10:
-        n = 2
-    else:
-        n = 2
     total = 0
-    for _ in range(n):
+    for _ in range(mock_count(days_available)):
         total += mock_duration_min               # passation
         total += int(round(mock_duration_min * review_ratio))  # correction/retour
     return total
 
 
+def gap_adjustment_factors(user: UserProfile) -> Tuple[float, float]:
+    """Multiplicateurs (TEXO, TR) selon l'écart objectif / maîtrise."""
+    gap = max(0.0, user.target_grade - user.current_mastery)
+    if gap > 0.25:
+        return 1.0 + 0.25 * (gap / 0.75), 1.0 + 0.35 * (gap / 0.75)   # jusqu’à ~+8% / ~+12%
+    return 1.0, 1.0
+
+
+def apply_gap_factors(texo: int, tr: int, factors: Tuple[float, float]) -> Tuple[int, int]:
+    """(TEXO, TR) ajustés, arrondis ensemble : leur somme est l'arrondi de la somme exacte."""
+    if factors == (1.0, 1.0):
+        return texo, tr
+    raw = (texo * factors[0], tr * factors[1])
+    texo, tr = _apportion(int(round(raw[0] + raw[1])), list(raw))
+    return texo, tr
+
+
+# =========================
+#   Calendrier
+# =========================
+
+def parse_calendar_dates(text: str) -> Tuple[List[dt.date], List[Tuple[dt.date, dt.date]]]:
+    """'2025-11-11, 2025-12-22..2026-01-02' -> (jours fériés, intervalles)."""
+    holidays: List[dt.date] = []
+    ranges: List[Tuple[dt.date, dt.date]] = []
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if ".." in part:
+            lo, hi = (dt.date.fromisoformat(x.strip()) for x in part.split("..", 1))
+            ranges.append((lo, hi))
+        else:
+            holidays.append(dt.date.fromisoformat(part))
+    return holidays, ranges
+
+
+def blocked_day_mask(constraints: Constraints, start_date: Optional[dt.date] = None) -> bytearray:
+    """Compile calendrier + indices bloqués en un masque (1 = jour indisponible)."""
+    D = constraints.days_available
+    if constraints.calendar is not None:
+        mask = constraints.calendar.compile(start_date or dt.date.today(), D)
+    else:
+        mask = bytearray(D)
+    for d in constraints.blocked_days or []:
+        if 0 <= d < D:
+            mask[d] = 1
+    return mask
+
+
 # =========================
 #   Planification par jour
 # =========================
@@ -202,115 +449,181 @@ def distribute_minutes_over_days(
     constraints: Constraints,
     start_date: Optional[dt.date] = None
 ) -> List[PlanItem]:
+    """Examen unique en fin d'horizon : une seule fenêtre [0, D-1]."""
+    window = MilestonePlan("examen", 0, constraints.days_available - 1,
+                           learn_min, exo_min, review_min, mock_min)
+    return distribute_windows_over_days([window], constraints, start_date)
+
+
+def distribute_windows_over_days(
+    windows: List[MilestonePlan],
+    constraints: Constraints,
+    start_date: Optional[dt.date] = None,
+    review_before_milestone: bool = False
+) -> List[PlanItem]:
+    """
+    Répartit les minutes de chaque fenêtre (triées, disjointes) dans ses jours,
+    en un seul passage chronologique. Ce qui ne tient pas dans la fenêtre
+    déborde sur les jours précédents, jamais après l'évaluation.
+    review_before_milestone : vagues de révision comptées à rebours depuis le jour
+    de chaque évaluation (évaluations datées) plutôt qu'après le début de la fenêtre.
+
+    Toutes les quantités sont entières et conservées : pour chaque catégorie, la
+    somme des jours est exactement la somme des fenêtres. Les plafonds journaliers
+    sont respectés tant que la capacité suffit ; sinon le surplus est réparti
+    (plus fort reste) sur les jours ouvrés de la fenêtre, au-delà du plafond.
+    """
     D = constraints.days_available
-    blocked = set(constraints.blocked_days or [])
+    blocked = blocked_day_mask(constraints, start_date)
     maxd = constraints.max_minutes_per_day
     mind = constraints.min_minutes_per_day
 
-    # Partitionner par priorité temporelle :
+    # Partitionner par priorité temporelle, dans chaque fenêtre :
     #  - Apprentissage initial tôt
     #  - Exercices en milieu/fin
     #  - Révisions en vagues (J+1, J+3, J+7 ~ approximées)
-    #  - Mocks vers la fin (derniers 40%)
+    #  - Mocks vers la fin (derniers 40% avant l'évaluation)
     per_day = [dict(learn=0, exo=0, review=0, mock=0) for _ in range(D)]
+    load = [0] * D  # total déjà placé par jour
+    window_of = [len(windows)] * D  # fenêtre de chaque jour (len(windows) = après la dernière)
+    overflow = [dict(learn=0, exo=0, review=0, mock=0) for _ in windows]  # minutes sans place sous plafond
+
+    # Jours ouvrés (triés) : les jours bloqués sont écartés une fois pour toutes
+    open_days = [d for d in range(D) if not blocked[d]]
+
+    def open_between(first: int, last: int) -> List[int]:
+        return open_days[bisect_left(open_days, first):bisect_right(open_days, last)]
+
+    def open_before(last: int):
+        # jours ouvrés <= last, du plus tardif au plus tôt (parcours paresseux)
+        for i in range(bisect_right(open_days, last) - 1, -1, -1):
+            yield open_days[i]
 
     # Helper pour pousser des minutes dans des jours (respectant plafonds/fatigue)
-    def push(kind: str, minutes: int, day_order: List[int]):
+    def push(kind: str, minutes: int, day_order):
         remaining = minutes
         for d in day_order:
-            if d in blocked:
-                continue
-            cap = maxd - sum(per_day[d].values())
+            if remaining <= 0:
+                break
+            cap = maxd - load[d]
             if cap <= 0:
                 continue
             alloc = min(cap, remaining)
             per_day[d][kind] += alloc
+            load[d] += alloc
             remaining -= alloc
             # légère pénalité fatigue si dépasse un seuil intrajournalier
             # (on la gère implicitement en réduisant le cap disponible)
-            if remaining <= 0:
-                break
         return remaining
 
-    # Ordres de priorité et placements
-    days_idx = list(range(D))
-    last_40 = set(days_idx[int(D*0.6):]) if D > 1 else set([0])
-
-    # 1) Apprentissage initial: pousser dès le début
-    rem = push("learn", learn_min, days_idx)
-    # si reste (fenêtre trop serrée), overflow en continu
-    if rem > 0:
-        push("learn", rem, days_idx[::-1])
-
-    # 2) Exercices: milieux et fin (progression)
-    order_exo = list(range(D//3, D)) if D >= 3 else days_idx
-    rem = push("exo", exo_min, order_exo)
-    if rem > 0:
-        push("exo", rem, days_idx[::-1])
-
-    # 3) Révisions: placer par vagues approximatives
-    # On crée 3 vagues (ou 2 si D petit)
-    waves = []
-    if D >= 2:
-        waves.append([min(1, D-1)])        # J+1
-    if D >= 4:
-        waves.append([min(3, D-1)])        # J+3
-    if D >= 8:
-        waves.append([min(7, D-1)])        # J+7
-    if not waves:
-        waves = [[0]]
-    # Répartir TR uniformément sur ces vagues (avec diffusion autour du jour cible)
-    share = review_min // len(waves)
-    spill = review_min - share * len(waves)
-
-    def around(day: int) -> List[int]:
-        # renvoyer [d-1, d, d+1] borné
-        cand = [max(0, day-1), day, min(D-1, day+1)]
-        # unique en gardant l'ordre
-        seen = set()
-        out = []
-        for c in cand:
-            if c not in seen:
-                out.append(c)
-                seen.add(c)
-        return out
-
-    for i, w in enumerate(waves):
-        minutes = share + (1 if i < spill else 0)
-        target = w[0]
-        order = around(target)
-        rem = push("review", minutes, order)
+    for w_idx, w in enumerate(windows):
+        lo, hi = w.first_day, w.day_index
+        L = hi - lo + 1
+        for d in range(lo, hi + 1):
+            window_of[d] = w_idx
+        w_open = open_between(lo, hi)
+
+        # 1) Apprentissage initial: pousser dès le début
+        rem = push("learn", w.learn, w_open)
+        # si reste (fenêtre trop serrée), overflow en remontant avant l'évaluation
         if rem > 0:
-            push("review", rem, days_idx)
+            overflow[w_idx]["learn"] += push("learn", rem, open_before(hi))
 
-    # 4) Mocks: surtout dans le dernier 40% des jours
-    order_mock = [d for d in days_idx if d in last_40]
-    if not order_mock:
-        order_mock = days_idx
-    rem = push("mock", mock_min, order_mock)
-    if rem > 0:
-        push("mock", rem, days_idx[::-1])
+        # 2) Exercices: milieux et fin (progression)
+        order_exo = open_between(lo + L//3, hi) if L >= 3 else w_open
+        rem = push("exo", w.exercises, order_exo)
+        if rem > 0:
+            overflow[w_idx]["exo"] += push("exo", rem, open_before(hi))
+
+        # 3) Révisions: placer par vagues approximatives
+        # On crée 3 vagues (ou 2 si la fenêtre est courte) : J+1, J+3, J+7 après le début
+        # pour l'examen implicite ; avec des évaluations datées, J-1, J-3, J-7 avant chacune
+        offsets = [k for k, min_len in ((1, 2), (3, 4), (7, 8)) if L >= min_len]
+        if review_before_milestone:
+            waves = [hi - min(k, L-1) for k in offsets]
+        else:
+            waves = [lo + min(k, L-1) for k in offsets]
+        if not waves:
+            waves = [lo]
+        # Répartir TR uniformément sur ces vagues (avec diffusion autour du jour cible)
+        share = w.review // len(waves)
+        spill = w.review - share * len(waves)
+
+        def around(day: int) -> List[int]:
+            # renvoyer [d-1, d, d+1] borné à la fenêtre, sans les jours bloqués
+            cand = [max(lo, day-1), day, min(hi, day+1)]
+            # unique en gardant l'ordre
+            seen = set()
+            out = []
+            for c in cand:
+                if c not in seen and not blocked[c]:
+                    out.append(c)
+                    seen.add(c)
+            return out
+
+        for i, target in enumerate(waves):
+            minutes = share + (1 if i < spill else 0)
+            rem = push("review", minutes, around(target))
+            if rem > 0:
+                rem = push("review", rem, w_open)
+            if rem > 0:
+                overflow[w_idx]["review"] += push("review", rem, open_before(hi))
+
+        # 4) Mocks: surtout dans les derniers 40% de la fenêtre
+        order_mock = open_between(lo + int(L*0.6), hi) if L > 1 else w_open
+        if not order_mock:
+            order_mock = w_open
+        rem = push("mock", w.mock, order_mock)
+        if rem > 0:
+            overflow[w_idx]["mock"] += push("mock", rem, open_before(hi))
 
-    # Respect d'un minimum/jour: si une journée non bloquée est < min, remonter via réalloc légère
-    for d in days_idx:
-        if d in blocked:
+    # Surplus (tous les jours ouvrés jusqu'à l'évaluation sont pleins) : au-delà du plafond,
+    # réparti à parts égales sur les jours ouvrés de la fenêtre
+    for w_idx, w in enumerate(windows):
+        extra_total = sum(overflow[w_idx].values())
+        if extra_total == 0:
             continue
-        day_sum = sum(per_day[d].values())
+        days = (open_between(w.first_day, w.day_index) or list(open_before(w.day_index))
+                or list(range(w.first_day, w.day_index + 1)))
+        extras = _apportion(extra_total, [1.0] * len(days))
+        kinds = iter(["learn", "exo", "review", "mock"])
+        kind = next(kinds)
+        for d, extra in zip(days, extras):
+            while extra > 0:
+                while overflow[w_idx][kind] == 0:
+                    kind = next(kinds)
+                move = min(extra, overflow[w_idx][kind])
+                per_day[d][kind] += move
+                load[d] += move
+                overflow[w_idx][kind] -= move
+                extra -= move
+
+    # Respect d'un minimum/jour: si une journée non bloquée est < min, remonter via réalloc légère
+    # (uniquement depuis des jours de la même fenêtre, pour ne rien déplacer au-delà d'une évaluation)
+    for d in open_days:
+        day_sum = load[d]
         if day_sum == 0:
             continue
-        if day_sum < mind:
-            need = mind - day_sum
+        if day_sum < min(mind, maxd):
+            need = min(mind, maxd) - day_sum
+            w_idx = window_of[d]
+            lo = windows[w_idx].first_day if w_idx < len(windows) else windows[-1].day_index + 1
+            hi = windows[w_idx].day_index if w_idx < len(windows) else D - 1
             # essayer de « tirer » des jours plus chargés
-            for s in reversed(days_idx):
+            for s in open_before(hi):
+                if s < lo:
+                    break
                 if s == d:
                     continue
-                src_sum = sum(per_day[s].values())
+                src_sum = load[s]
                 if src_sum - need >= mind or src_sum > mind + 60:
                     # déplacer depuis review puis exo puis learn
                     for k in ["review", "exo", "learn", "mock"]:
                         move = min(per_day[s][k], need)
                         per_day[s][k] -= move
                         per_day[d][k] += move
+                        load[s] -= move
+                        load[d] += move
                         need -= move
                         if need <= 0:
                             break
@@ -319,76 +632,365 @@ def distribute_minutes_over_days(
 
     # Construire la liste finale
     items: List[PlanItem] = []
-    for d in days_idx:
+    for d in range(D):
         date_str = None
         if start_date:
             date_str = (start_date + dt.timedelta(days=d)).isoformat()
         items.append(PlanItem(
             day_index=d,
             date=date_str,
-            learn_min=int(round(per_day[d]["learn"])),
-            exercises_min=int(round(per_day[d]["exo"])),
-            review_min=int(round(per_day[d]["review"])),
-            mock_min=int(round(per_day[d]["mock"])),
+            learn_min=per_day[d]["learn"],
+            exercises_min=per_day[d]["exo"],
+            review_min=per_day[d]["review"],
+            mock_min=per_day[d]["mock"],
         ))
     return items
 
 
 # =========================
-#   Orchestrateur principal
+#   Séances dans la journée
 # =========================
 
-def build_study_plan(
+def parse_time_windows(text: str) -> List[Tuple[int, int]]:
+    """'09:00-12:00, 14:00-18:00' -> [(540, 720), (840, 1080)]."""
+    def to_min(hhmm: str) -> int:
+        h, m = hhmm.strip().split(":")
+        return int(h) * 60 + int(m)
+    windows = []
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        lo, hi = part.split("-", 1)
+        windows.append((to_min(lo), to_min(hi)))
+    return windows
+
+
+def format_clock(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def _normalize_windows(windows: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Trie et fusionne les plages qui se chevauchent."""
+    merged: List[Tuple[int, int]] = []
+    for lo, hi in sorted(w for w in windows if w[1] > w[0]):
+        if merged and lo <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], hi))
+        else:
+            merged.append((lo, hi))
+    return merged
+
+
+def _day_sessions(item: PlanItem, windows: List[Tuple[int, int]], user: UserProfile) -> List[StudySession]:
+    threshold, penalty = user.fatigue_threshold_min, user.fatigue_penalty
+
+    # Durée réelle (avec fatigue) de `work` minutes, et l'inverse
+    def wall_for(work: float, worked: int) -> float:
+        fresh = max(0, min(work, threshold - worked))
+        return fresh + (work - fresh) * penalty
+
+    def work_for(wall: float, worked: int) -> float:
+        fresh = max(0, min(wall, threshold - worked))
+        return fresh + (wall - fresh) / penalty
+
+    out: List[StudySession] = []
+    wi = 0
+    t = windows[0][0] if windows else 8*60
+    worked = 0        # minutes de travail cumulées dans la journée
+    since_break = 0   # minutes enchaînées depuis la dernière pause
+
+    def next_window() -> None:
+        nonlocal wi, t, since_break
+        wi += 1
+        if wi < len(windows):
+            t = max(t, windows[wi][0])
+            since_break = 0
+
+    def add(kind: str, start: int, wall: int, work: int, in_window: bool) -> None:
+        prev = out[-1] if out else None
+        if prev and prev.kind == kind and prev.end_min == start and prev.in_window == in_window:
+            prev.end_min += wall
+            prev.work_min += work
+        else:
+            out.append(StudySession(item.day_index, item.date, kind, start, start + wall, work, in_window))
+
+    tasks = [("learn", item.learn_min), ("exercises", item.exercises_min),
+             ("review", item.review_min), ("mock", item.mock_min)]
+    for kind, minutes in tasks:
+        remaining = minutes
+        if kind == "mock" and remaining > 0:
+            # Examen blanc : un seul bloc continu, dans la première plage assez longue
+            wall = ceil(wall_for(remaining, worked))
+            while wi < len(windows) and windows[wi][1] - t < wall:
+                next_window()
+            add(kind, t, wall, remaining, wi < len(windows))
+            t += wall + user.break_min
+            worked += remaining
+            since_break = 0
+            continue
+        while remaining > 0:
+            while wi < len(windows) and t >= windows[wi][1]:
+                next_window()
+            in_window = wi < len(windows)
+            avail = user.session_length_min - since_break
+            if in_window:
+                avail = min(avail, windows[wi][1] - t)
+            work = min(remaining, floor(work_for(avail, worked)))
+            if work <= 0 and not in_window and since_break == 0:
+                work = 1  # pénalité extrême : avancer quand même
+            if work <= 0:
+                # Fin de séance (pause) ou reliquat de plage trop court
+                if since_break >= user.session_length_min or not in_window:
+                    t += user.break_min
+                    since_break = 0
+                else:
+                    t = windows[wi][1]
+                continue
+            wall = ceil(wall_for(work, worked))
+            add(kind, t, wall, work, in_window)
+            t += wall
+            since_break += wall
+            worked += work
+            remaining -= work
+            if since_break >= user.session_length_min:
+                t += user.break_min
+                since_break = 0
+    return out
+
+
+def schedule_sessions(per_day: List[PlanItem], user: UserProfile) -> List[StudySession]:
+    """
+    Découpe chaque journée en séances horodatées (pauses, plages disponibles).
+    Au-delà de fatigue_threshold_min, chaque minute de travail coûte fatigue_penalty minutes.
+    """
+    windows = _normalize_windows(user.availability_windows)
+    sessions: List[StudySession] = []
+    for item in per_day:
+        sessions.extend(_day_sessions(item, windows, user))
+    return sessions
+
+
+# =========================
+#   Évaluations multiples
+# =========================
+
+def milestone_windows(
     contents: List[ContentBlock],
-    exam: ExamProfile,
+    assessments: List[Assessment],
     user: UserProfile,
-    constraints: Constraints,
-    start_date: Optional[dt.date] = None,
+    days_available: int,
+    table: Dict[str, float],
+    gap_factors: Tuple[float, float],
     want_mocks: bool = True,
     mock_duration_min: int = 90,
-    mock_review_ratio: float = 0.5
-) -> PlanResult:
+    mock_review_ratio: float = 0.5,
+    coeffs: Coefficients = DEFAULT_COEFFICIENTS
+) -> List[MilestonePlan]:
+    """
+    Une fenêtre par évaluation, de la veille de la précédente (exclue) au jour de l'évaluation.
+    - Apprentissage : chaque bloc est appris avant la première évaluation qui le couvre
+      (les blocs couverts par aucune sont appris après la dernière, ou avant elle si l'horizon s'y arrête).
+    - Exercices : dimensionnés avec l'ExamProfile de l'évaluation, au prorata du contenu couvert.
+    - Révision : sur tout le contenu couvert, horizon = jours écoulés jusqu'à l'évaluation.
+    - Examens blancs : d'après la longueur de la fenêtre.
+    Une évaluation qui ne couvre aucun bloc ne reçoit ni exercices, ni révision, ni examen blanc.
+    """
+    ordered = sorted(assessments, key=lambda a: a.day_index)
+    for a in ordered:
+        if not 0 <= a.day_index < days_available:
+            raise ValueError(f"{a.name}: jour {a.day_index} hors de l'horizon (0..{days_available - 1})")
+        for i in a.block_indices or []:
+            if not 0 <= i < len(contents):
+                raise ValueError(f"{a.name}: bloc {i} inexistant")
+    for prev, cur in zip(ordered, ordered[1:]):
+        if prev.day_index == cur.day_index:
+            raise ValueError(f"{prev.name} et {cur.name} tombent le même jour")
+
+    block_learn = [learning_from_quantities(content_quantities([b]), table) for b in contents]
+    total_learn = sum(block_learn)
+    first_cover = [None] * len(contents)   # indice (dans ordered) de la 1re évaluation couvrant le bloc
+    covered: List[List[int]] = []
+    for k, a in enumerate(ordered):
+        idx = sorted(set(range(len(contents)) if a.block_indices is None else a.block_indices))
+        covered.append(idx)
+        for i in idx:
+            if first_cover[i] is None:
+                first_cover[i] = k
+    # Apprentissage par fenêtre (la dernière part = contenu hors évaluation), arrondi d'un bloc
+    raw_learn = [0.0] * (len(ordered) + 1)
+    for i, c in enumerate(first_cover):
+        raw_learn[len(ordered) if c is None else c] += block_learn[i]
+    learn = _apportion(int(round(total_learn)), raw_learn)
+
+    windows: List[MilestonePlan] = []
+    lo = 0
+    for k, a in enumerate(ordered):
+        covered_learn = int(round(sum(block_learn[i] for i in covered[k])))
+        share = sum(block_learn[i] for i in covered[k]) / total_learn if total_learn else 1.0
+        exo_blocks = [contents[i] for i in covered[k] if contents[i].unit_type == "exo"]
+        texo = estimate_exercise_minutes(exo_blocks, a.exam, user, coeffs)
+        if share != 1.0:
+            texo = int(round(texo * share))
+        tr = estimate_review_minutes(covered_learn, user, a.day_index + 1, coeffs)
+        texo, tr = apply_gap_factors(texo, tr, gap_factors)
+        teb = estimate_mock_minutes(a.day_index - lo + 1, want_mocks and a.want_mocks,
+                                    mock_duration_min, mock_review_ratio)
+        if not covered[k]:
+            texo = tr = teb = 0   # évaluation sans contenu : rien à réviser ni à simuler
+        windows.append(MilestonePlan(a.name, lo, a.day_index, learn[k], texo, tr, teb))
+        lo = a.day_index + 1
+
+    # Contenu hors évaluation
+    rest = learn[-1]
+    if rest:
+        if lo < days_available:
+            windows.append(MilestonePlan("hors évaluation", lo, days_available - 1, rest, 0, 0, 0))
+        else:
+            windows[-1].learn += rest
+    return windows
 
-    # 1) Temps d'appropriation initiale (TAI)
-    TAI = estimate_initial_learning_minutes(contents, user)
 
-    # 2) Temps d’exercices (TEXO)
-    TEXO = estimate_exercise_minutes(contents, exam, user)
+# =========================
+#   Orchestrateur principal
+# =========================
 
-    # 3) Temps de révision (TR) – courbe de l’oubli
-    TR = estimate_review_minutes(TAI, user, constraints.days_available)
+class PlanGraph:
+    """
+    Évaluation incrémentale de build_study_plan.
 
-    # 4) Examens blancs (TEB)
-    TEB = estimate_mock_minutes(constraints.days_available, want_mocks, mock_duration_min, mock_review_ratio)
+    Chaque phase (TAI, TEXO, TR, TEB, ajustement d'écart, fenêtres d'évaluation,
+    répartition, séances) est un nœud dont la sortie est mise en cache. Un nœud
+    n'est recalculé que si la valeur d'une de ses dépendances a changé ; si sa
+    nouvelle sortie est égale à l'ancienne, ses descendants ne sont pas invalidés.
+    """
 
-    # 5) Ajustement selon objectif vs maîtrise : gonfle TR/TEXO si gros écart
-    gap = max(0.0, user.target_grade - user.current_mastery)
-    if gap > 0.25:
-        TEXO = int(round(TEXO * (1.0 + 0.25 * (gap / 0.75))))   # jusqu’à ~+8%
-        TR   = int(round(TR   * (1.0 + 0.35 * (gap / 0.75))))   # jusqu’à ~+12%
-
-    # 6) Répartition par jour avec plafonds/fatigue
-    schedule = distribute_minutes_over_days(
-        learn_min=TAI,
-        exo_min=TEXO,
-        review_min=TR,
-        mock_min=TEB,
-        constraints=constraints,
-        start_date=start_date
-    )
+    INPUTS = ("contents", "exam", "user", "constraints", "start_date", "want_mocks",
+              "mock_duration_min", "mock_review_ratio", "coeffs", "with_sessions", "assessments")
+
+    # nœud -> (dépendances, calcul)
+    NODES = {
+        "days": (("constraints",), lambda c: c.days_available),
+        "quantities": (("contents",), content_quantities),
+        "exo_blocks": (("contents",), lambda blocks: [b for b in blocks if b.unit_type == "exo"]),
+        "unit_table": (("user", "coeffs"), unit_multiplier_table),
+        # 1) Temps d'appropriation initiale (TAI)
+        "TAI": (("quantities", "unit_table"),
+                lambda q, table: int(round(learning_from_quantities(q, table)))),
+        # 2) Temps d’exercices (TEXO)
+        "TEXO": (("exo_blocks", "exam", "user", "coeffs"), estimate_exercise_minutes),
+        # 3) Temps de révision (TR) – courbe de l’oubli
+        "TR": (("TAI", "user", "days", "coeffs"), estimate_review_minutes),
+        # 4) Examens blancs (TEB)
+        "TEB": (("days", "want_mocks", "mock_duration_min", "mock_review_ratio"), estimate_mock_minutes),
+        # 5) Ajustement selon objectif vs maîtrise : gonfle TR/TEXO si gros écart
+        "gap_factors": (("user",), gap_adjustment_factors),
+        "adjusted": (("TEXO", "TR", "gap_factors"), apply_gap_factors),
+        # 6) Fenêtres : une seule (examen final au jour D-1) ou une par évaluation datée
+        "windows": (("TAI", "adjusted", "TEB", "days", "assessments", "contents", "user", "unit_table",
+                     "gap_factors", "want_mocks", "mock_duration_min", "mock_review_ratio", "coeffs"),
+                    lambda tai, adj, teb, days, assessments, contents, user, table, gap, mocks, dur, ratio, coeffs:
+                    [MilestonePlan("examen", 0, days - 1, tai, adj[0], adj[1], teb)] if not assessments
+                    else milestone_windows(contents, assessments, user, days, table, gap, mocks, dur, ratio, coeffs)),
+        # 7) Répartition par jour avec plafonds/fatigue (révisions à rebours si évaluations datées)
+        "review_before_milestone": (("assessments",), bool),
+        "schedule": (("windows", "constraints", "start_date", "review_before_milestone"),
+                     distribute_windows_over_days),
+        # 8) (Optionnel) Séances horaires dans chaque journée
+        "sessions": (("schedule", "user", "with_sessions"),
+                     lambda schedule, user, on: schedule_sessions(schedule, user) if on else None),
+        "breakdown": (("windows",),
+                      lambda windows: {"learn": sum(w.learn for w in windows),
+                                       "exercises": sum(w.exercises for w in windows),
+                                       "review": sum(w.review for w in windows),
+                                       "mock": sum(w.mock for w in windows)}),
+        "result": (("breakdown", "windows", "assessments", "schedule", "sessions", "user", "constraints"),
+                   lambda br, windows, assessments, schedule, sessions, user, cons: PlanResult(
+                       total_minutes=sum(br.values()),
+                       per_day=schedule,
+                       breakdown=br,
+                       params_used={
+                           "target_grade": user.target_grade,
+                           "current_mastery": user.current_mastery,
+                           "days_available": cons.days_available,
+                           "max_minutes_per_day": cons.max_minutes_per_day,
+                           # minutes placées au-delà du plafond faute de capacité (0 si tout tient)
+                           "cap_overflow_minutes": sum(max(0, it.learn_min + it.exercises_min + it.review_min
+                                                           + it.mock_min - cons.max_minutes_per_day)
+                                                       for it in schedule),
+                       },
+                       sessions=sessions,
+                       milestones=windows if assessments else None)),
+    }
 
-    total = TAI + TEXO + TR + TEB
-    return PlanResult(
-        total_minutes=total,
-        per_day=schedule,
-        breakdown={"learn": TAI, "exercises": TEXO, "review": TR, "mock": TEB},
-        params_used={
-            "target_grade": user.target_grade,
-            "current_mastery": user.current_mastery,
-            "days_available": constraints.days_available,
-            "max_minutes_per_day": constraints.max_minutes_per_day
-        }
-    )
+    def __init__(self, copy_inputs: bool = True):
+        self.copy_inputs = copy_inputs    # copier les entrées (l'appelant peut les modifier ensuite)
+        self._values: Dict[str, object] = {"start_date": None, "want_mocks": True, "mock_duration_min": 90,
+                                           "mock_review_ratio": 0.5, "coeffs": DEFAULT_COEFFICIENTS,
+                                           "with_sessions": False, "assessments": None}
+        self._version: Dict[str, int] = {name: 0 for name in self._values}
+        self._cache: Dict[str, Tuple[object, Tuple[int, ...]]] = {}
+        self._clock = 0
+        self.recomputed: List[str] = []   # nœuds recalculés lors du dernier result()
+
+    def update(self, **inputs) -> None:
+        for name, value in inputs.items():
+            if name not in self.INPUTS:
+                raise TypeError(f"entrée inconnue: {name}")
+            if name == "coeffs" and value is None:
+                value = DEFAULT_COEFFICIENTS
+            if name in self._values and self._values[name] == value:
+                continue
+            self._values[name] = deepcopy(value) if self.copy_inputs else value
+            self._clock += 1
+            self._version[name] = self._clock
+
+    def _get(self, name: str):
+        if name in self.INPUTS:
+            if name not in self._values:
+                raise TypeError(f"entrée manquante: {name}")
+            return self._values[name]
+        deps, fn = self.NODES[name]
+        args = [self._get(d) for d in deps]
+        versions = tuple(self._version[d] for d in deps)
+        cached = self._cache.get(name)
+        if cached is not None and cached[1] == versions:
+            return cached[0]
+        value = fn(*args)
+        self.recomputed.append(name)
+        if cached is None or cached[0] != value:
+            self._clock += 1
+            self._version[name] = self._clock
+        self._cache[name] = (value, versions)
+        return value
+
+    def result(self) -> PlanResult:
+        self.recomputed = []
+        return self._get("result")
+
+
+def build_study_plan(
+    contents: List[ContentBlock],
+    exam: ExamProfile,
+    user: UserProfile,
+    constraints: Constraints,
+    start_date: Optional[dt.date] = None,
+    want_mocks: bool = True,
+    mock_duration_min: int = 90,
+    mock_review_ratio: float = 0.5,
+    coeffs: Optional[Coefficients] = None,
+    with_sessions: bool = False,
+    assessments: Optional[List[Assessment]] = None
+) -> PlanResult:
+    """
+    assessments : évaluations datées (quiz, partiels, final). Sans elles, un examen
+    unique (profil `exam`) est supposé au dernier jour de l'horizon.
+    """
+    graph = PlanGraph(copy_inputs=False)
+    graph.update(contents=contents, exam=exam, user=user, constraints=constraints,
+                 start_date=start_date, want_mocks=want_mocks, mock_duration_min=mock_duration_min,
+                 mock_review_ratio=mock_review_ratio, coeffs=coeffs, with_sessions=with_sessions,
+                 assessments=assessments)
+    return graph.result()
 
 
 # =========================
@@ -468,6 +1070,23 @@ def demander_jours_bloques(prompt: str) -> Optional[List[int]]:
         return None
 
 
+def demander_calendrier(prompt_jours: str, prompt_dates: str) -> Optional[StudyCalendar]:
+    while True:
+        weekdays = demander_jours_bloques(prompt_jours) or []
+        if all(0 <= wd <= 6 for wd in weekdays):
+            break
+        print("Les jours de la semaine vont de 0 (lundi) à 6 (dimanche).")
+    raw = _input_with_default(prompt_dates, "")
+    try:
+        holidays, ranges = parse_calendar_dates(raw)
+    except ValueError:
+        print("Entrée invalide. Aucune date bloquée enregistrée.")
+        holidays, ranges = [], []
+    if not (weekdays or holidays or ranges):
+        return None
+    return StudyCalendar(blocked_weekdays=weekdays, blocked_ranges=ranges, holidays=holidays)
+
+
 def demander_date(prompt: str) -> Optional[dt.date]:
     raw = _input_with_default(prompt, "")
     if not raw:
@@ -493,10 +1112,10 @@ if __name__ == "__main__":
         print(f"\nBloc de contenu #{i+1}")
         units = demander_entier("Nombre d'unités (pages, slides, minutes de vidéo, exercices)", default=70, minimum=1)
         unit_type = _input_with_default(
-            "Type d'unité (page/slide/video_min/exo)",
+            f"Type d'unité ({'/'.join(UNIT_TYPE_REGISTRY)})",
             "slide"
         ) or "slide"
-        if unit_type not in UNIT_BASE_MIN:
+        if unit_type not in UNIT_TYPE_REGISTRY:
             print(f"Type inconnu. Utilisation de 'slide'.")
             unit_type = "slide"
         difficulty = demander_flottant("Coefficient de difficulté (0.7 facile, 1.0 moyen, 1.3 difficile)", default=1.0, minimum=0.1)
@@ -558,11 +1177,16 @@ if __name__ == "__main__":
     max_minutes = demander_entier("Minutes maximales par jour", default=240, minimum=30)
     min_minutes = demander_entier("Minutes minimales par jour", default=60, minimum=0)
     blocked = demander_jours_bloques("Jours indisponibles (indices 0..n-1 séparés par des virgules)")
+    calendar = demander_calendrier(
+        "Jours de la semaine bloqués (0=lundi .. 6=dimanche, séparés par des virgules)",
+        "Dates bloquées (AAAA-MM-JJ ou AAAA-MM-JJ..AAAA-MM-JJ, séparées par des virgules)",
+    )
     constraints = Constraints(
         days_available=days_available,
         max_minutes_per_day=max_minutes,
         min_minutes_per_day=min_minutes,
         blocked_days=blocked,
+        calendar=calendar,
     )
 
     start_date = demander_date("Date de début (AAAA-MM-JJ, vide pour aujourd'hui)")
@@ -570,7 +1194,8 @@ if __name__ == "__main__":
     mock_duration = demander_entier("Durée d'un examen blanc (minutes)", default=90, minimum=10)
     mock_review_ratio = demander_flottant("Part du temps dédiée à la correction (0-1)", default=0.5, minimum=0.0)
 
-    plan = build_study_plan(
+    from plan_cache import cached_build_study_plan  # import local : plan_cache dépend de ce module
+    plan = cached_build_study_plan(
         contents,
         exam,
         user,
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Modules du projet à la racine du dépôt (pas de paquet installable)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
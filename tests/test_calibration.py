@@ -0,0 +1,37 @@
+import csv
+import random
+
+import pytest
+
+from calibration import fit_coefficients
+
+LEARN_FIELDS = ["units", "difficulty", "novelty", "density", "user_speed", "notes_factor", "language_penalty"]
+
+
+def _write_log(path, extra_columns):
+    """Journal « learn » synthétique : minutes = 3.0 min/page, 1.5 min/slide."""
+    rng = random.Random(0)
+    truth = {"page": 3.0, "slide": 1.5}
+    header = ["phase", "unit_type", *LEARN_FIELDS, "minutes", *extra_columns]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(header)
+        for i in range(200):
+            unit_type = "page" if i % 2 else "slide"
+            units = rng.randint(5, 100)
+            diff, nov = rng.uniform(0.7, 1.3), rng.uniform(0.7, 1.3)
+            reference = 2.5 if unit_type == "page" else 1.0   # user_speed = vitesse de référence du type
+            minutes = truth[unit_type] * units * diff * nov
+            extras = {"student_id": f"s{i % 7}", "logged_at": f"2026-03-{i % 28 + 1:02d}T10:00:00"}
+            w.writerow(["learn", unit_type, units, diff, nov, 1.0, reference, 1.0, 1.0, minutes,
+                        *(extras[c] for c in extra_columns)])
+    return truth
+
+
+@pytest.mark.parametrize("extra_columns", [[], ["student_id", "logged_at"]])
+def test_fit_ignores_unused_columns(tmp_path, extra_columns):
+    path = tmp_path / "log.csv"
+    truth = _write_log(path, extra_columns)
+    coeffs = fit_coefficients(str(path), chunk_size=64)
+    for unit_type, base in truth.items():
+        assert coeffs.unit_base_min[unit_type] == pytest.approx(base)
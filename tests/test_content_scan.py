@@ -0,0 +1,96 @@
+import struct
+import zlib
+
+import pytest
+
+from content_scan import _page_tree_count, _root_page_count, pdf_page_count
+
+CATALOG = b"<< /Type /Catalog /Pages 2 0 R >>"
+
+
+def _pages(n, first=3):
+    kids = b" ".join(b"%d 0 R" % (first + i) for i in range(n))
+    return b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, n)
+
+
+def _page_objects(n, first=3):
+    return {first + i: b"<< /Type /Page /Parent 2 0 R >>" for i in range(n)}
+
+
+def _classic_pdf(objects, prefix=b"%PDF-1.4\n", prev=None):
+    """PDF (ou mise à jour incrémentale si prefix/prev) avec table « xref » classique."""
+    out = bytearray(prefix)
+    offsets = {}
+    for num, body in objects.items():
+        offsets[num] = len(out)
+        out += b"%d 0 obj\n%s\nendobj\n" % (num, body)
+    xref = len(out)
+    out += b"xref\n0 1\n0000000000 65535 f \n"
+    for num in sorted(offsets):
+        out += b"%d 1\n%010d 00000 n \n" % (num, offsets[num])
+    trailer = b"/Size %d /Root 1 0 R" % (max(offsets) + 1)
+    if prev is not None:
+        trailer += b" /Prev %d" % prev
+    out += b"trailer\n<< %s >>\nstartxref\n%d\n%%%%EOF\n" % (trailer, xref)
+    return bytes(out), xref
+
+
+def _xref_stream_pdf(n_pages):
+    """PDF 1.5 : catalogue et racine des pages dans un flux d'objets, flux xref avec prédicteur PNG."""
+    out = bytearray(b"%PDF-1.5\n")
+    entries = {0: (0, 0, 65535)}
+    for num, body in _page_objects(n_pages).items():
+        entries[num] = (1, len(out), 0)
+        out += b"%d 0 obj\n%s\nendobj\n" % (num, body)
+    header, data = b"", b""
+    for rank, (num, body) in enumerate(((1, CATALOG), (2, _pages(n_pages)))):
+        header += b"%d %d " % (num, len(data))
+        data += body + b"\n"
+        entries[num] = (2, 100, rank)
+    stm = zlib.compress(header + data)
+    entries[100] = (1, len(out), 0)
+    out += (b"100 0 obj\n<< /Type /ObjStm /N 2 /First %d /Filter /FlateDecode /Length %d >>\nstream\n"
+            % (len(header), len(stm)) + stm + b"\nendstream\nendobj\n")
+    xref = len(out)
+    entries[101] = (1, xref, 0)
+    size = max(entries) + 1
+    rows, prev = b"", bytes(7)
+    for num in range(size):
+        row = struct.pack(">BIH", *entries.get(num, (0, 0, 0)))
+        rows += b"\x02" + bytes((a - b) & 0xFF for a, b in zip(row, prev))   # prédicteur PNG « Up »
+        prev = row
+    body = zlib.compress(rows)
+    out += (b"101 0 obj\n<< /Type /XRef /Size %d /W [1 4 2] /Root 1 0 R /Filter /FlateDecode "
+            b"/DecodeParms << /Predictor 12 /Columns 7 >> /Length %d >>\nstream\n" % (size, len(body))
+            + body + b"\nendstream\nendobj\n")
+    out += b"startxref\n%d\n%%%%EOF\n" % xref
+    return bytes(out)
+
+
+@pytest.fixture
+def incremental_pdf(tmp_path):
+    """5 pages, puis une mise à jour incrémentale qui en supprime 2 (l'ancienne racine reste dans le fichier)."""
+    base, xref = _classic_pdf({1: CATALOG, 2: _pages(5), **_page_objects(5)})
+    data, _ = _classic_pdf({2: _pages(3)}, prefix=base, prev=xref)
+    path = tmp_path / "incremental.pdf"
+    path.write_bytes(data)
+    return path
+
+
+def test_incremental_update_uses_current_root(incremental_pdf):
+    assert _root_page_count(incremental_pdf.read_bytes()) == 5   # l'heuristique se trompe
+    assert pdf_page_count(str(incremental_pdf)) == 3
+
+
+def test_xref_and_object_streams(tmp_path):
+    path = tmp_path / "compressed.pdf"
+    path.write_bytes(_xref_stream_pdf(4))
+    assert _page_tree_count(path.read_bytes()) == 4
+    assert pdf_page_count(str(path)) == 4
+
+
+def test_broken_xref_falls_back_to_scan(tmp_path):
+    data, xref = _classic_pdf({1: CATALOG, 2: _pages(6), **_page_objects(6)})
+    path = tmp_path / "broken.pdf"
+    path.write_bytes(data.replace(b"startxref\n%d" % xref, b"startxref\n%d" % (xref + 3)))
+    assert pdf_page_count(str(path)) == 6
@@ -0,0 +1,28 @@
+import datetime as dt
+
+from ics_export import _unique_name, iter_ics_lines
+from study_planner import Constraints, ContentBlock, ExamProfile, UserProfile, build_study_plan
+
+
+def _uids(pages, uid_prefix, with_sessions=False):
+    plan = build_study_plan([ContentBlock(units=pages, unit_type="page")], ExamProfile(), UserProfile(),
+                            Constraints(days_available=10), start_date=dt.date(2026, 1, 5),
+                            with_sessions=with_sessions)
+    return [line[4:] for line in iter_ics_lines(plan, uid_prefix=uid_prefix) if line.startswith("UID:")]
+
+
+def test_uids_stable_across_regenerated_plans():
+    # un plan régénéré (entrées modifiées) garde les UID de ses jours : l'agenda met à jour au lieu de dupliquer
+    before, after = _uids(100, "MATH101"), _uids(120, "MATH101")
+    assert before and set(before) <= set(after)
+    assert len(set(_uids(100, "MATH101", with_sessions=True))) == len(_uids(100, "MATH101", with_sessions=True))
+
+
+def test_uids_distinct_across_courses():
+    assert not set(_uids(100, "MATH101")) & set(_uids(100, "PHYS 201"))
+    assert all(" " not in uid for uid in _uids(100, "PHYS 201"))
+
+
+def test_unique_cohort_names():
+    used = set()
+    assert [_unique_name(s, used) for s in ["a b", "a_b", "A_B", "a b"]] == ["a_b", "a_b-2", "A_B-3", "a_b-4"]
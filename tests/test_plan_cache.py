@@ -0,0 +1,30 @@
+from plan_cache import PlanCache, cached_build_study_plan
+from study_planner import Constraints, ContentBlock, ExamProfile, UserProfile, build_study_plan
+
+INPUTS = dict(contents=[ContentBlock(units=40, unit_type="page")], exam=ExamProfile(),
+              user=UserProfile(), constraints=Constraints(days_available=7))
+
+
+def test_hit_after_miss(tmp_path):
+    cache = PlanCache(tmp_path / "cache")
+    first = cached_build_study_plan(**INPUTS, cache=cache)
+    second = cached_build_study_plan(**INPUTS, cache=cache)
+    assert first == second == build_study_plan(**INPUTS)
+    assert (cache.misses, cache.hits) == (1, 1)
+
+
+def test_unusable_directory_is_a_miss(tmp_path):
+    not_a_dir = tmp_path / "fichier"
+    not_a_dir.write_bytes(b"")
+    cache = PlanCache(not_a_dir)
+    assert cached_build_study_plan(**INPUTS, cache=cache) == build_study_plan(**INPUTS)
+    assert cache.misses == 1
+
+
+def test_corrupted_entry_is_a_miss(tmp_path):
+    cache = PlanCache(tmp_path / "cache")
+    cached_build_study_plan(**INPUTS, cache=cache)
+    entry, = (tmp_path / "cache").glob("*/*.plan")
+    entry.write_bytes(entry.read_bytes()[:10])
+    assert cached_build_study_plan(**INPUTS, cache=cache) == build_study_plan(**INPUTS)
+    assert cache.hits == 0
@@ -0,0 +1,57 @@
+import datetime as dt
+
+import pytest
+
+from plan_codec import BLOCK_DAYS, PlanView, decode_plan, encode_plan
+from study_planner import (
+    Assessment, Constraints, ContentBlock, ExamProfile, UserProfile, build_study_plan,
+)
+
+CONTENTS = [ContentBlock(units=300, unit_type="page"), ContentBlock(units=40, unit_type="exo")]
+
+
+def _plan(days, start_date=None, with_sessions=False, assessments=None):
+    return build_study_plan(CONTENTS, ExamProfile(), UserProfile(), Constraints(days_available=days),
+                            start_date=start_date, with_sessions=with_sessions, assessments=assessments)
+
+
+@pytest.mark.parametrize("start_date", [None, dt.date(2026, 1, 5)])
+@pytest.mark.parametrize("with_sessions", [False, True])
+@pytest.mark.parametrize("days", [1, 10, BLOCK_DAYS, 200])
+def test_roundtrip(days, start_date, with_sessions):
+    plan = _plan(days, start_date, with_sessions)
+    assert decode_plan(encode_plan(plan)) == plan
+
+
+def test_roundtrip_with_milestones():
+    plan = _plan(90, dt.date(2026, 9, 1), assessments=[
+        Assessment("Partiel", 30, ExamProfile(), [0]),
+        Assessment("Final", 89, ExamProfile()),
+    ])
+    assert plan.milestones
+    assert decode_plan(encode_plan(plan)) == plan
+
+
+def test_view_day_across_block_boundary():
+    plan = _plan(3 * BLOCK_DAYS + 5, dt.date(2026, 1, 5))
+    view = PlanView(encode_plan(plan))
+    assert len(view) == len(plan.per_day)
+    for i in (0, BLOCK_DAYS - 1, BLOCK_DAYS, BLOCK_DAYS + 1, 2 * BLOCK_DAYS, len(plan.per_day) - 1):
+        assert view.day(i) == plan.per_day[i]
+    with pytest.raises(IndexError):
+        view.day(len(plan.per_day))
+
+
+def test_reads_v1_buffer():
+    # La version 1 a la même disposition, sans section jalons
+    plan = _plan(100, dt.date(2026, 1, 5), with_sessions=True)
+    data = bytearray(encode_plan(plan))
+    data[4] = 1
+    assert decode_plan(bytes(data)) == plan
+
+
+def test_truncated_buffer_raises_value_error():
+    data = encode_plan(_plan(100, dt.date(2026, 1, 5), with_sessions=True))
+    for n in range(len(data)):
+        with pytest.raises(ValueError):
+            decode_plan(data[:n])
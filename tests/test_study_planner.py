@@ -0,0 +1,117 @@
+import random
+
+import pytest
+
+from study_planner import (
+    Assessment, Constraints, ContentBlock, ExamProfile, UserProfile, _apportion, build_study_plan,
+)
+
+CONTENTS = [ContentBlock(units=100, unit_type="page"), ContentBlock(units=20, unit_type="exo")]
+
+
+def _review_days(plan):
+    return [it.day_index for it in plan.per_day if it.review_min]
+
+
+@pytest.mark.parametrize("block_indices", [None, [0], [0, 1]])
+def test_single_assessment_review_before_milestone(block_indices):
+    plan = build_study_plan(CONTENTS, ExamProfile(), UserProfile(),
+                            Constraints(days_available=30, min_minutes_per_day=0),
+                            assessments=[Assessment("Final", 20, ExamProfile(), block_indices)])
+    days = _review_days(plan)
+    assert days
+    assert all(20 - 8 <= d <= 20 for d in days)   # vagues J-7, J-3, J-1 (± 1 jour)
+
+
+def test_implicit_exam_review_after_start():
+    plan = build_study_plan(CONTENTS, ExamProfile(), UserProfile(),
+                            Constraints(days_available=30, min_minutes_per_day=0))
+    days = _review_days(plan)
+    assert days
+    assert all(d <= 8 for d in days)   # vagues J+1, J+3, J+7 (± 1 jour)
+
+
+# =========================
+#   Invariants de répartition (plus fort reste, plafonds)
+# =========================
+
+UNIT_TYPES = ["page", "slide", "video_min", "exo"]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_apportion_exact_and_proportional(seed):
+    rng = random.Random(seed)
+    for _ in range(500):
+        weights = [rng.random() * rng.choice([0, 1, 100]) for _ in range(rng.randint(1, 30))]
+        total = rng.randint(0, 5000)
+        shares = _apportion(total, weights)
+        assert sum(shares) == total
+        wsum = sum(weights) or len(weights)
+        quotas = [total * (w if sum(weights) else 1.0) / wsum for w in weights]
+        assert all(abs(s - q) < 1 for s, q in zip(shares, quotas))
+
+
+def _loads(plan):
+    return [it.learn_min + it.exercises_min + it.review_min + it.mock_min for it in plan.per_day]
+
+
+def _random_plan(rng, with_assessments):
+    contents = [ContentBlock(rng.randint(1, 900), rng.choice(UNIT_TYPES), round(rng.uniform(0.7, 1.3), 2))
+                for _ in range(rng.randint(1, 6))]
+    D = rng.randint(1, 60)
+    constraints = Constraints(days_available=D, max_minutes_per_day=rng.randint(30, 400),
+                              min_minutes_per_day=rng.randint(0, 120),
+                              blocked_days=rng.sample(range(D), rng.randint(0, D // 2)))
+    assessments = None
+    if with_assessments:
+        days = sorted(rng.sample(range(D), min(D, rng.randint(1, 3))))
+        assessments = [Assessment(f"e{j}", d, ExamProfile(),
+                                  rng.sample(range(len(contents)), rng.randint(1, len(contents)))
+                                  if rng.random() < 0.7 else None)
+                       for j, d in enumerate(days)]
+    user = UserProfile(target_grade=rng.uniform(0.5, 1.0), current_mastery=rng.uniform(0.0, 1.0))
+    plan = build_study_plan(contents, ExamProfile(), user, constraints, want_mocks=rng.random() < 0.8,
+                            assessments=assessments)
+    return plan, constraints
+
+
+@pytest.mark.parametrize("with_assessments", [False, True])
+def test_distribution_invariants(with_assessments):
+    rng = random.Random(1234 + with_assessments)
+    for _ in range(300):
+        plan, cons = _random_plan(rng, with_assessments)
+        cap, blocked = cons.max_minutes_per_day, set(cons.blocked_days)
+        loads = _loads(plan)
+
+        # Totaux : jours = catégories = breakdown = total
+        sums = {"learn": sum(it.learn_min for it in plan.per_day),
+                "exercises": sum(it.exercises_min for it in plan.per_day),
+                "review": sum(it.review_min for it in plan.per_day),
+                "mock": sum(it.mock_min for it in plan.per_day)}
+        assert sums == plan.breakdown
+        assert sum(loads) == plan.total_minutes
+
+        # Surplus déclaré = minutes au-delà du plafond
+        overflow = plan.params_used["cap_overflow_minutes"]
+        assert overflow == sum(max(0, load - cap) for load in loads)
+
+        # Capacité suffisante (pour chaque évaluation, tout ce qui est dû tient dans les jours ouvrés
+        # jusqu'à elle) => aucun jour au-delà du plafond
+        windows = plan.milestones or [None]
+        due, fits = 0, True
+        for w in windows:
+            last = w.day_index if w else cons.days_available - 1
+            due += (w.learn + w.exercises + w.review + w.mock) if w else plan.total_minutes
+            fits &= due <= cap * sum(1 for d in range(last + 1) if d not in blocked)
+        if fits:
+            assert overflow == 0 and max(loads) <= cap
+        else:
+            assert overflow > 0
+
+
+def test_overflow_reported_when_capacity_short():
+    plan = build_study_plan([ContentBlock(units=200, unit_type="page")], ExamProfile(), UserProfile(),
+                            Constraints(days_available=3, max_minutes_per_day=60, blocked_days=[1]))
+    loads = _loads(plan)
+    assert loads[1] == 0
+    assert plan.params_used["cap_overflow_minutes"] == plan.total_minutes - 2 * 60